@@ -0,0 +1,171 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from argparse import Namespace
+from typing import Optional
+
+REPO_ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRYPOINT: str = os.path.join(REPO_ROOT, "preparation_before_fine_tuning.py")
+MODEL_NAME: str = "startup_benchmark"
+
+# コピー元として渡すディレクトリ。音声ファイル以外のファイルのみを置くため、
+# 引数の検証は通過し、コピーの対象は 0 件になります。
+SOURCE_DIR: str = "source"
+
+# 計測対象の CLI モード。空のデータディレクトリで実行するため、
+# 各ステージは処理対象が無いまま終了し、起動コストのみが計測されます。
+# --normalize-only は外部コマンド（ffmpeg）を起動してしまうため対象外です。
+MODES: dict[str, list[str]] = {
+    "help": ["--help"],
+    "copy-only": ["--copy-only", "--copy-source-raw-directory", SOURCE_DIR],
+    "separate-only": ["--separate-only"],
+    "transcribe-only": ["--transcribe-only"],
+    "before-text-reformatting-only": ["--before-text-reformatting-only"],
+}
+
+
+def parse_arguments() -> Namespace:
+    """
+    コマンドライン引数を解析します。
+    """
+    parser = argparse.ArgumentParser(
+        description="preparation_before_fine_tuning.py の CLI モードごとの"
+        "起動時間と最大メモリ使用量（RSS）を計測します。"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="[OPTION] 各モードの計測回数。デフォルトは 5 です。",
+    )
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=sorted(MODES),
+        default=list(MODES),
+        help="[OPTION] 計測する CLI モード。デフォルトはすべてのモードです。",
+    )
+    parser.add_argument(
+        "--output",
+        help="[OPTION] 計測結果を JSON で保存するファイルのパス。",
+    )
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        help="[OPTION] 起動時間（中央値、秒）の上限。超えた場合は終了コード 1 で終了します。",
+    )
+    parser.add_argument(
+        "--max-rss-mb",
+        type=float,
+        help="[OPTION] 最大 RSS（MB）の上限。超えた場合は終了コード 1 で終了します。",
+    )
+    return parser.parse_args()
+
+
+def run_once(mode_args: list[str], work_dir: str) -> tuple[float, float]:
+    """
+    CLI を 1 回起動し、経過時間（秒）と最大 RSS（MB）を返します。
+
+    CLI が 0 以外の終了コードで終了した場合は、標準エラー出力を含めて RuntimeError を送出します。
+    """
+    command: list[str] = [
+        sys.executable,
+        ENTRYPOINT,
+        "--model-name",
+        MODEL_NAME,
+        *mode_args,
+    ]
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    # パイプの詰まりを避けるため、標準エラー出力は一時ファイルに書き込む
+    with tempfile.TemporaryFile() as stderr:
+        started: float = time.perf_counter()
+        process = subprocess.Popen(
+            command,
+            cwd=work_dir,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=stderr,
+        )
+        # wait4 で子プロセス単体の rusage を取得する（Linux では ru_maxrss は KB 単位）
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed: float = time.perf_counter() - started
+        process.returncode = os.waitstatus_to_exitcode(status)
+        if process.returncode != 0:
+            stderr.seek(0)
+            raise RuntimeError(
+                f"CLI が終了コード {process.returncode} で終了しました: {' '.join(mode_args)}\n"
+                + stderr.read().decode(errors="replace")
+            )
+    return elapsed, usage.ru_maxrss / 1024
+
+
+def measure_mode(mode: str, repeat: int) -> dict:
+    """
+    指定した CLI モードを繰り返し起動し、計測結果を集計します。
+    """
+    elapsed_list: list[float] = []
+    rss_list: list[float] = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.makedirs(os.path.join(work_dir, SOURCE_DIR))
+        with open(os.path.join(work_dir, SOURCE_DIR, "README.txt"), "w") as f:
+            f.write("startup benchmark")
+        for _ in range(repeat):
+            elapsed, rss = run_once(MODES[mode], work_dir)
+            elapsed_list.append(elapsed)
+            rss_list.append(rss)
+    elapsed_list.sort()
+    return {
+        "mode": mode,
+        "repeat": repeat,
+        "median_seconds": elapsed_list[len(elapsed_list) // 2],
+        "min_seconds": elapsed_list[0],
+        "max_rss_mb": max(rss_list),
+    }
+
+
+def main(args: Optional[Namespace] = None) -> None:
+    """
+    メイン関数。CLI モードごとの起動時間と最大 RSS を計測し、結果を表示します。
+    """
+    if args is None:
+        args = parse_arguments()
+
+    try:
+        results: list[dict] = [
+            measure_mode(mode, args.repeat) for mode in args.modes
+        ]
+    except RuntimeError as e:
+        print(f"計測に失敗しました: {e}")
+        sys.exit(1)
+
+    print(f"{'mode':<32}{'median[s]':>12}{'min[s]':>12}{'max RSS[MB]':>14}")
+    failed: bool = False
+    for result in results:
+        print(
+            f"{result['mode']:<32}"
+            f"{result['median_seconds']:>12.3f}"
+            f"{result['min_seconds']:>12.3f}"
+            f"{result['max_rss_mb']:>14.1f}"
+        )
+        if args.max_seconds is not None and result["median_seconds"] > args.max_seconds:
+            print(f"起動時間が上限を超えました: {result['mode']}")
+            failed = True
+        if args.max_rss_mb is not None and result["max_rss_mb"] > args.max_rss_mb:
+            print(f"最大 RSS が上限を超えました: {result['mode']}")
+            failed = True
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"計測結果を保存しました: {args.output}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import os
+import sys
+import json
+import time
+import argparse
+from argparse import Namespace
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.audio_stream import probe_duration  # noqa: E402
+from scripts.speech_to_text import (  # noqa: E402
+    WHISPER_BACKENDS,
+    load_model,
+    speech_to_text,
+)
+
+
+def parse_arguments() -> Namespace:
+    """
+    コマンドライン引数を解析します。
+    """
+    parser = argparse.ArgumentParser(
+        description="Whisper の推論バックエンドごとのスループットと、"
+        "fp32 に対する文字起こし結果の一致度（CER）を計測します。"
+    )
+    parser.add_argument(
+        "--corpus-dir",
+        required=True,
+        help="[REQUIRED] 計測に使用する音声ファイル（mp3, wav）のディレクトリ",
+    )
+    parser.add_argument(
+        "--whisper-model-name",
+        type=str,
+        default="base",
+        help="[OPTION] Whisper で使用するモデル。デフォルトは 'base' です。",
+    )
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        choices=WHISPER_BACKENDS,
+        default=list(WHISPER_BACKENDS),
+        help="[OPTION] 計測するバックエンド。デフォルトはすべてのバックエンドです。",
+    )
+    parser.add_argument(
+        "--output",
+        help="[OPTION] 計測結果を JSON で保存するファイルのパス。",
+    )
+    return parser.parse_args()
+
+
+def edit_distance(reference: str, hypothesis: str) -> int:
+    """
+    2 つの文字列の編集距離（レーベンシュタイン距離）を計算します。
+    """
+    previous: list[int] = list(range(len(hypothesis) + 1))
+    for i, ref_char in enumerate(reference, start=1):
+        current: list[int] = [i]
+        for j, hyp_char in enumerate(hypothesis, start=1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (ref_char != hyp_char),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+def character_error_rate(references: list[str], hypotheses: list[str]) -> float:
+    """
+    コーパス全体の文字誤り率（CER）を計算します。空白は無視します。
+    """
+    errors: int = 0
+    total: int = 0
+    for reference, hypothesis in zip(references, hypotheses):
+        reference = "".join(reference.split())
+        hypothesis = "".join(hypothesis.split())
+        errors += edit_distance(reference, hypothesis)
+        total += len(reference)
+    return errors / total if total else 0.0
+
+
+def measure_backend(files: list[str], model_name: str, backend: str) -> dict:
+    """
+    指定したバックエンドでコーパスを文字起こしし、所要時間と文字起こし結果を返します。
+    """
+    started: float = time.perf_counter()
+    load_model(model_name, backend)
+    load_seconds: float = time.perf_counter() - started
+
+    texts: list[str] = []
+    started = time.perf_counter()
+    for file in files:
+        texts.append(speech_to_text(file, model_name, backend))
+    transcribe_seconds: float = time.perf_counter() - started
+    return {
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "transcribe_seconds": transcribe_seconds,
+        "texts": texts,
+    }
+
+
+def main(args: Optional[Namespace] = None) -> None:
+    """
+    メイン関数。バックエンドごとにコーパスを文字起こしし、計測結果を表示します。
+    """
+    if args is None:
+        args = parse_arguments()
+
+    files: list[str] = [
+        os.path.join(args.corpus_dir, file)
+        for file in sorted(os.listdir(args.corpus_dir))
+        if file.endswith((".mp3", ".wav"))
+    ]
+    if not files:
+        print(f"指定されたディレクトリに音声ファイルが存在しません: {args.corpus_dir}")
+        sys.exit(1)
+    audio_seconds: float = sum(probe_duration(file) for file in files)
+
+    results: list[dict] = [
+        measure_backend(files, args.whisper_model_name, backend)
+        for backend in args.backends
+    ]
+    reference: Optional[dict] = next(
+        (result for result in results if result["backend"] == "fp32"), None
+    )
+
+    print(f"コーパス: {len(files)} ファイル、{audio_seconds:.1f} 秒")
+    print(f"{'backend':<10}{'load[s]':>10}{'transcribe[s]':>16}{'RTFx':>10}{'CER':>10}")
+    for result in results:
+        result["realtime_factor"] = audio_seconds / result["transcribe_seconds"]
+        if reference is not None:
+            result["cer_vs_fp32"] = character_error_rate(
+                reference["texts"], result["texts"]
+            )
+        cer: str = (
+            f"{result['cer_vs_fp32']:.4f}" if "cer_vs_fp32" in result else "-"
+        )
+        print(
+            f"{result['backend']:<10}"
+            f"{result['load_seconds']:>10.2f}"
+            f"{result['transcribe_seconds']:>16.2f}"
+            f"{result['realtime_factor']:>10.2f}"
+            f"{cer:>10}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "whisper_model_name": args.whisper_model_name,
+                    "files": files,
+                    "audio_seconds": audio_seconds,
+                    "results": results,
+                },
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+        print(f"計測結果を保存しました: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
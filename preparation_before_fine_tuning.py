@@ -1,10 +1,5 @@
-import scripts.create_and_copy_data as create_and_copy_data
-import scripts.separate as separate
-import scripts.speech_to_text as speech_to_text
-import scripts.prepare_before_text_reformatting as prepare_before_text_reformatting
 import sys
 import argparse
-import subprocess
 import os
 from argparse import Namespace
 from typing import Optional
@@ -15,6 +10,8 @@ def parse_arguments() -> argparse.ArgumentParser:
     """
     コマンドライン引数を解析します。
     """
+    from scripts.create_and_copy_data import COMPARE_MODES
+
     parser = argparse.ArgumentParser(
         description="カスタムモデルを生成します。\n\n"
         "このスクリプトは指定された音声ファイルを分割し、"
@@ -90,11 +87,33 @@ def parse_arguments() -> argparse.ArgumentParser:
         default="base",
         help="[OPTION] Whisper で使用するモデル。デフォルトは 'base' です。",
     )
+    parser.add_argument(
+        "--whisper-backend",
+        type=str,
+        choices=("fp32", "int8"),
+        default="fp32",
+        help="[OPTION] Whisper の推論バックエンド。'int8' は線形層を動的量子化して CPU で推論します。"
+        "デフォルトは 'fp32' です。",
+    )
     parser.add_argument(
         "--force-copy",
         action="store_true",
         help="[OPTION] ファイルコピーを強制します。",
     )
+    parser.add_argument(
+        "--copy-workers",
+        type=int,
+        default=4,
+        help="[OPTION] 並列にコピーするファイル数。デフォルトは 4 です。",
+    )
+    parser.add_argument(
+        "--copy-compare",
+        choices=COMPARE_MODES,
+        default="mtime",
+        help="[OPTION] コピー済みかどうかの判定方法。'mtime' はサイズと更新日時、"
+        "'checksum' は SHA-256 で比較します。コピー後の検証は、'mtime' ではサイズとコピー中に"
+        "コピー元が変更されていないことのみ、'checksum' では SHA-256 も確認します。デフォルトは 'mtime' です。",
+    )
     parser.add_argument(
         "--force-separate",
         action="store_true",
@@ -105,6 +124,12 @@ def parse_arguments() -> argparse.ArgumentParser:
         action="store_true",
         help="[OPTION] ラウドネス正規化を強制します。",
     )
+    parser.add_argument(
+        "--normalize-workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="[OPTION] 並列にラウドネス正規化するファイル数。デフォルトは CPU のコア数です。",
+    )
     parser.add_argument(
         "--before-text-reformatting-only",
         action="store_true",
@@ -115,56 +140,174 @@ def parse_arguments() -> argparse.ArgumentParser:
         action="store_true",
         help="[OPTION] before_text_reformatting を強制します。",
     )
+    parser.add_argument(
+        "--disable-quality-gate",
+        action="store_true",
+        help="[OPTION] 文字起こし結果の品質による除外を行わずに、すべてのセグメントを配置します。",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="[OPTION] 何も処理せずに、各ステージの処理量と所要時間・ディスク使用量の見積もりを表示します。",
+    )
+    parser.add_argument(
+        "--plan-terms",
+        type=int,
+        nargs="+",
+        help="[OPTION] --plan で比較する分割の間隔（秒）。デフォルトは --term の値のみです。",
+    )
+    parser.add_argument(
+        "--plan-overlays",
+        type=int,
+        nargs="+",
+        help="[OPTION] --plan で比較する分割の重なり（秒）。デフォルトは --overlay の値のみです。",
+    )
+    parser.add_argument(
+        "--plan-workers",
+        type=int,
+        nargs="+",
+        help="[OPTION] --plan で比較するコピーの並列数。デフォルトは --copy-workers の値です。"
+        "正規化は --normalize-workers の並列数で見積もります。",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="[OPTION] コピー元のディレクトリを監視し、新しい音声ファイルを順に処理し続けます。",
+    )
+    parser.add_argument(
+        "--watch-settle-seconds",
+        type=float,
+        default=5.0,
+        help="[OPTION] ファイルの書き込みが完了したとみなすまでの、変化が無い時間（秒）。"
+        "デフォルトは 5.0 です。",
+    )
+    parser.add_argument(
+        "--watch-poll-interval",
+        type=float,
+        default=2.0,
+        help="[OPTION] ディレクトリを再スキャンする間隔（秒）。デフォルトは 2.0 です。",
+    )
     return parser
 
 
-def normalize_loudness(input_dir: str, output_dir: str, loudness_target: float) -> None:
+def normalize_loudness(
+    input_dir: str, output_dir: str, loudness_target: float, workers: int
+) -> None:
     """
     ディレクトリ内の音声ファイルにラウドネス正規化を適用します。
+
+    測定とゲインの適用は ffmpeg のストリーム処理で行うため、
+    分割の間隔（--term）にかかわらずメモリ使用量は一定です。
+    ファイルは workers 個ずつ並列に処理します。
     """
-    command = [
-        "fap",
-        "loudness-norm",
-        input_dir,
-        output_dir,
-        "--clean",
-        "--loudness",
-        str(loudness_target),
+    import scripts.planner as planner
+    from scripts.audio_stream import normalize_loudness_files
+
+    jobs: list[tuple[str, str]] = [
+        (os.path.join(input_dir, file), os.path.join(output_dir, file))
+        for file in sorted(os.listdir(input_dir))
+        if file.endswith((".mp3", ".wav"))
     ]
-    subprocess.run(command, check=True)
+    with planner.profile_stage("normalize", output_dir, workers=workers):
+        normalize_loudness_files(jobs, loudness_target, workers)
 
 
 def transcribe_audio(
-    input_dir: str, output_dir: str, extension: str, force: bool, model_name: str
+    input_dir: str,
+    output_dir: str,
+    extension: str,
+    force: bool,
+    model_name: str,
+    backend: str = "fp32",
+    feature_store_dir: Optional[str] = None,
 ) -> None:
     """
     音声ファイルからテキストデータを抽出し、同名のファイルに保存します。
+
+    feature_store_dir を指定した場合、log-mel スペクトログラムを特徴量ストアに保存して再利用し、
+    input_dir から無くなった音声ファイルのエントリを削除します。
     """
-    for file in sorted(os.listdir(input_dir)):
-        if file.endswith((".mp3", ".wav")):
-            output_file: str = os.path.join(
-                output_dir, os.path.splitext(file)[0] + f".{extension}"
-            )
-            if os.path.exists(output_file):
-                if force:
-                    os.remove(output_file)
-                else:
-                    print(f"スキップされたファイル: {output_file}（既に存在します）")
-                    continue
-            speech_to_text.main(
-                Namespace(
-                    input_dir=input_dir,
-                    output_dir=output_dir,
-                    extension=extension,
-                    whisper_model_name=model_name,
+    import scripts.planner as planner
+
+    with planner.profile_stage(
+        f"transcribe:{model_name}:{backend}",
+        output_dir,
+        (f".{extension}",),
+        audio_dir=input_dir,
+    ):
+        for file in sorted(os.listdir(input_dir)):
+            if file.endswith((".mp3", ".wav")):
+                output_file: str = os.path.join(
+                    output_dir, os.path.splitext(file)[0] + f".{extension}"
                 )
+                if os.path.exists(output_file):
+                    if force:
+                        os.remove(output_file)
+                    else:
+                        print(f"スキップされたファイル: {output_file}（既に存在します）")
+                        continue
+                # whisper（torch）の読み込みは重いため、実際に文字起こしが必要になるまで遅延させる
+                import scripts.speech_to_text as speech_to_text
+
+                result: dict = speech_to_text.transcribe(
+                    os.path.join(input_dir, file), model_name, backend, feature_store_dir
+                )
+                speech_to_text.write_transcription(output_file, result)
+                print(f"テキストデータを保存しました: {output_file}")
+
+    if feature_store_dir is not None:
+        import scripts.feature_store as feature_store
+
+        feature_store.evict_features(feature_store_dir, input_dir)
+
+
+def copy_audio(args: Namespace, raw_dir: str) -> None:
+    """
+    コピー元のディレクトリの音声ファイルを raw ディレクトリにコピーします。
+    """
+    import scripts.create_and_copy_data as create_and_copy_data
+    import scripts.planner as planner
+
+    with planner.profile_stage("copy", raw_dir, workers=args.copy_workers):
+        create_and_copy_data.main(
+            Namespace(
+                model_name=args.model_name,
+                copy_source_raw_directory=args.copy_source_raw_directory,
+                force_file_copy=args.force_copy,
+                copy_workers=args.copy_workers,
+                copy_compare=args.copy_compare,
             )
-            print(f"テキストデータを保存しました: {output_file}")
+        )
+
+
+def separate_audio(
+    raw_dir: str, separate_dir: str, start: int, term: int, overlay: int, force: bool
+) -> None:
+    """
+    raw ディレクトリ内の音声ファイルを指定の間隔で分割します。
+    """
+    import scripts.planner as planner
+    import scripts.separate as separate
+
+    with planner.profile_stage("separate", separate_dir):
+        for file in sorted(os.listdir(raw_dir)):
+            if file.endswith((".mp3", ".wav")):
+                separate_args = Namespace(
+                    input=os.path.join(raw_dir, file),
+                    output_dir=separate_dir,
+                    start=start,
+                    interval=term,
+                    overlay=overlay,
+                    force=force,
+                )
+                separate.main(separate_args)
 
 
 def main(args: Optional[Namespace] = None) -> None:
     """
     メイン関数。コマンドライン引数を解析し、音声ファイルのコピーと分割を実行します。
+
+    各ステージの依存モジュールは、そのステージを実行する時点で読み込みます。
     """
     parser = parse_arguments()
     if len(sys.argv) == 1:
@@ -177,12 +320,63 @@ def main(args: Optional[Namespace] = None) -> None:
     normalize_dir: str = os.path.join(f"./data/{args.model_name}", "normalize_loudness")
     transcribe_dir: str = os.path.join(f"./data/{args.model_name}", "transcriptions")
     finetune_dir: str = os.path.join(f"./data/{args.model_name}", "finetune")
+    feature_store_dir: str = os.path.join(f"./data/{args.model_name}", "features")
+    before_text_reformatting_dir: str = os.path.join(
+        f"./data/{args.model_name}", "before_text_reformatting"
+    )
+
+    # 何も処理せずに実行計画を表示
+    if args.plan:
+        import scripts.planner as planner
+
+        planner.main(
+            args,
+            {
+                "raw": raw_dir,
+                "separate": separate_dir,
+                "normalize": normalize_dir,
+                "transcribe": transcribe_dir,
+                "before_text_reformatting": before_text_reformatting_dir,
+            },
+        )
+        sys.exit(0)
+
     os.makedirs(separate_dir, exist_ok=True)
     os.makedirs(normalize_dir, exist_ok=True)
     os.makedirs(transcribe_dir, exist_ok=True)
     os.makedirs(finetune_dir, exist_ok=True)
     normalize_flag_file: str = os.path.join(normalize_dir, ".normalized")
 
+    # コピー元のディレクトリを監視し続ける
+    if args.watch:
+        if args.copy_source_raw_directory is None or not os.path.isdir(
+            args.copy_source_raw_directory
+        ):
+            print(
+                f"指定されたディレクトリが存在しません: {args.copy_source_raw_directory}"
+            )
+            sys.exit(1)
+        import scripts.watch as watch
+
+        watch.run(
+            args,
+            {
+                "raw": raw_dir,
+                "separate": separate_dir,
+                "normalize": normalize_dir,
+                "transcribe": transcribe_dir,
+                "features": feature_store_dir,
+                "before_text_reformatting": before_text_reformatting_dir,
+                "status_file": os.path.join(
+                    f"./data/{args.model_name}", "watch_status.json"
+                ),
+                "quality_report": os.path.join(
+                    f"./data/{args.model_name}", "quality_report.json"
+                ),
+            },
+        )
+        sys.exit(0)
+
     # ファイルコピーのみを実行
     if args.copy_only:
         if args.copy_source_raw_directory is None:
@@ -201,23 +395,19 @@ def main(args: Optional[Namespace] = None) -> None:
                 f"指定されたディレクトリにファイルが存在しません: {args.copy_source_raw_directory}"
             )
             sys.exit(1)
-        create_and_copy_data.main(args)
+        copy_audio(args, raw_dir)
         sys.exit(0)
 
     # ファイル分割のみを実行
     if args.separate_only:
-        for file in sorted(os.listdir(raw_dir)):
-            if file.endswith((".mp3", ".wav")):
-                input_file: str = os.path.join(raw_dir, file)
-                separate_args = Namespace(
-                    input=input_file,
-                    output_dir=separate_dir,
-                    start=args.start,
-                    interval=args.term,
-                    overlay=args.overlay,
-                    force=args.separate_only,
-                )
-                separate.main(separate_args)
+        separate_audio(
+            raw_dir,
+            separate_dir,
+            args.start,
+            args.term,
+            args.overlay,
+            args.separate_only,
+        )
         sys.exit(0)
 
     # ファイル正規化のみを実行
@@ -226,7 +416,9 @@ def main(args: Optional[Namespace] = None) -> None:
             print("ラウドネス正規化は既に適用されています。")
         else:
             # ラウドネス正規化を適用
-            normalize_loudness(separate_dir, normalize_dir, args.loudness_target)
+            normalize_loudness(
+                separate_dir, normalize_dir, args.loudness_target, args.normalize_workers
+            )
             with open(normalize_flag_file, "w") as f:
                 f.write("normalized")
         sys.exit(0)
@@ -240,17 +432,24 @@ def main(args: Optional[Namespace] = None) -> None:
             args.transcription_extension,
             args.force_transcribe,
             args.whisper_model_name,
+            args.whisper_backend,
+            feature_store_dir,
         )
         sys.exit(0)
 
     # セマンティックトークンを払い出す前の前処理のみを実行
     if args.before_text_reformatting_only:
-        prepare_before_text_reformatting.main(
-            Namespace(
-                model_name=args.model_name,
-                force_before_text_reformatting=args.force_before_text_reformatting,
+        import scripts.planner as planner
+        import scripts.prepare_before_text_reformatting as prepare_before_text_reformatting
+
+        with planner.profile_stage("stage", before_text_reformatting_dir):
+            prepare_before_text_reformatting.main(
+                Namespace(
+                    model_name=args.model_name,
+                    force_before_text_reformatting=args.force_before_text_reformatting,
+                    disable_quality_gate=args.disable_quality_gate,
+                )
             )
-        )
         sys.exit(0)
 
     # ファイルコピーから実行
@@ -269,25 +468,26 @@ def main(args: Optional[Namespace] = None) -> None:
         )
         sys.exit(1)
 
+    # ファイルをコピー
+    copy_audio(args, raw_dir)
+
     # ファイルを分割
-    for file in sorted(os.listdir(raw_dir)):
-        if file.endswith((".mp3", ".wav")):
-            input_file2: str = os.path.join(raw_dir, file)
-            separate_args = Namespace(
-                input=input_file2,
-                output_dir=separate_dir,
-                start=args.start,
-                interval=args.term,
-                overlay=args.overlay,
-                force=args.separate_only,
-            )
-            separate.main(separate_args)
+    separate_audio(
+        raw_dir,
+        separate_dir,
+        args.start,
+        args.term,
+        args.overlay,
+        args.separate_only,
+    )
 
     # ラウドネス正規化を適用
     if os.path.exists(normalize_flag_file) and not args.force_normalize:
         print("ラウドネス正規化は既に適用されています。")
     else:
-        normalize_loudness(separate_dir, normalize_dir, args.loudness_target)
+        normalize_loudness(
+            separate_dir, normalize_dir, args.loudness_target, args.normalize_workers
+        )
         with open(normalize_flag_file, "w") as f:
             f.write("normalized")
             print("ラウドネス正規化を適用しました。")
@@ -299,15 +499,22 @@ def main(args: Optional[Namespace] = None) -> None:
         args.transcription_extension,
         args.force_transcribe,
         args.whisper_model_name,
+        args.whisper_backend,
+        feature_store_dir,
     )
 
     # before_text_reformatting の準備
-    prepare_before_text_reformatting.main(
-        Namespace(
-            model_name=args.model_name,
-            force_before_text_reformatting=args.force_before_text_reformatting,
+    import scripts.planner as planner
+    import scripts.prepare_before_text_reformatting as prepare_before_text_reformatting
+
+    with planner.profile_stage("stage", before_text_reformatting_dir):
+        prepare_before_text_reformatting.main(
+            Namespace(
+                model_name=args.model_name,
+                force_before_text_reformatting=args.force_before_text_reformatting,
+                disable_quality_gate=args.disable_quality_gate,
+            )
         )
-    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,269 @@
+import os
+import re
+import struct
+import subprocess
+from typing import TYPE_CHECKING, Iterator, Optional
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Whisper が想定するサンプリングレート（Hz）
+SAMPLE_RATE: int = 16000
+# 16bit PCM の 1 サンプルあたりのバイト数
+SAMPLE_WIDTH: int = 2
+# ffmpeg の ebur128 フィルターが無音に対して報告するラウドネスの下限（LUFS）
+SILENCE_LOUDNESS: float = -70.0
+
+
+def read_wav_header(input_file: str) -> Optional[dict]:
+    """
+    WAV ファイルのヘッダーを読み取り、フォーマット情報とデータ位置を返します。
+
+    PCM の WAV ファイルでない場合は None を返します。
+    """
+    if not input_file.lower().endswith(".wav"):
+        return None
+    with open(input_file, "rb") as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[0:4] != b"RIFF" or riff[8:12] != b"WAVE":
+            return None
+        header: dict = {}
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return None
+            chunk_id, chunk_size = struct.unpack("<4sI", chunk)
+            if chunk_id == b"fmt ":
+                fmt = f.read(chunk_size)
+                audio_format, channels, sample_rate, _, _, bits = struct.unpack(
+                    "<HHIIHH", fmt[:16]
+                )
+                header.update(
+                    audio_format=audio_format,
+                    channels=channels,
+                    sample_rate=sample_rate,
+                    bits_per_sample=bits,
+                )
+                if chunk_size % 2:
+                    f.seek(1, os.SEEK_CUR)
+            elif chunk_id == b"data":
+                if "audio_format" not in header or header["audio_format"] != 1:
+                    return None
+                header.update(data_offset=f.tell(), data_size=chunk_size)
+                return header
+            else:
+                f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+
+def probe_duration(input_file: str) -> float:
+    """
+    音声ファイルの総再生時間（秒）を取得します。
+
+    PCM の WAV ファイルはヘッダーから計算し、それ以外は ffprobe で取得します。
+    どちらの場合もファイル全体は読み込みません。
+    """
+    header = read_wav_header(input_file)
+    if header is not None:
+        frame_size: int = header["channels"] * header["bits_per_sample"] // 8
+        data_size: int = min(
+            header["data_size"], os.path.getsize(input_file) - header["data_offset"]
+        )
+        return data_size / frame_size / header["sample_rate"]
+
+    result = subprocess.run(
+        [
+            "ffprobe",
+            "-v",
+            "error",
+            "-show_entries",
+            "format=duration",
+            "-of",
+            "default=noprint_wrappers=1:nokey=1",
+            input_file,
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    return float(result.stdout)
+
+
+def _iter_memmap_chunks(
+    input_file: str, header: dict, chunk_samples: int
+) -> Iterator["np.ndarray"]:
+    """
+    16kHz モノラル 16bit の WAV ファイルをメモリマップし、チャンクごとに返します。
+    """
+    import numpy as np
+
+    data_size: int = min(
+        header["data_size"], os.path.getsize(input_file) - header["data_offset"]
+    )
+    samples = np.memmap(
+        input_file,
+        dtype="<i2",
+        mode="r",
+        offset=header["data_offset"],
+        shape=(data_size // SAMPLE_WIDTH,),
+    )
+    for start in range(0, len(samples), chunk_samples):
+        yield samples[start : start + chunk_samples].astype(np.float32) / 32768.0
+
+
+def _iter_ffmpeg_chunks(
+    input_file: str, chunk_samples: int
+) -> Iterator["np.ndarray"]:
+    """
+    ffmpeg で 16kHz モノラルにデコードした音声をパイプから読み取り、チャンクごとに返します。
+    """
+    import tempfile
+    import numpy as np
+
+    command: list[str] = [
+        "ffmpeg",
+        "-nostdin",
+        "-v",
+        "error",
+        "-i",
+        input_file,
+        "-f",
+        "s16le",
+        "-ac",
+        "1",
+        "-ar",
+        str(SAMPLE_RATE),
+        "-",
+    ]
+    chunk_bytes: int = chunk_samples * SAMPLE_WIDTH
+    # パイプだと stdout を読んでいる間に stderr が詰まるため、エラー出力は一時ファイルに受ける
+    stderr = tempfile.TemporaryFile()
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr)
+    finished: bool = False
+    try:
+        while True:
+            buffer = bytearray(chunk_bytes)
+            view = memoryview(buffer)
+            filled: int = 0
+            while filled < chunk_bytes:
+                read = process.stdout.readinto(view[filled:])
+                if not read:
+                    break
+                filled += read
+            filled -= filled % SAMPLE_WIDTH
+            if filled == 0:
+                break
+            samples = np.frombuffer(buffer, dtype="<i2", count=filled // SAMPLE_WIDTH)
+            yield samples.astype(np.float32) / 32768.0
+            if filled < chunk_bytes:
+                break
+        finished = True
+    finally:
+        process.stdout.close()
+        if not finished:
+            # 呼び出し側が途中で読み込みをやめた場合のみ、デコードを打ち切る
+            process.kill()
+        returncode: int = process.wait()
+        stderr.seek(0)
+        output: bytes = stderr.read()
+        stderr.close()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(
+            returncode, command, stderr=output.decode(errors="replace")
+        )
+
+
+def iter_audio_chunks(
+    input_file: str, chunk_seconds: float = 30.0
+) -> Iterator["np.ndarray"]:
+    """
+    音声ファイルを 16kHz モノラルの float32 配列として、固定長のチャンクごとに返します。
+
+    16kHz モノラル 16bit の WAV ファイルはメモリマップで、それ以外は ffmpeg のパイプで読み取るため、
+    入力ファイルの長さにかかわらずメモリ使用量はチャンク 1 つ分に収まります。
+    """
+    chunk_samples: int = int(chunk_seconds * SAMPLE_RATE)
+    header = read_wav_header(input_file)
+    if (
+        header is not None
+        and header["channels"] == 1
+        and header["sample_rate"] == SAMPLE_RATE
+        and header["bits_per_sample"] == SAMPLE_WIDTH * 8
+    ):
+        yield from _iter_memmap_chunks(input_file, header, chunk_samples)
+    else:
+        yield from _iter_ffmpeg_chunks(input_file, chunk_samples)
+
+
+def measure_loudness(input_file: str) -> float:
+    """
+    ffmpeg の ebur128 フィルタで音声ファイルの統合ラウドネス（LUFS）を測定します。
+
+    ffmpeg がストリームとして処理するため、入力ファイルの長さにかかわらずメモリ使用量は一定です。
+    """
+    command: list[str] = [
+        "ffmpeg",
+        "-nostdin",
+        "-hide_banner",
+        "-nostats",
+        "-i",
+        input_file,
+        "-af",
+        "ebur128=framelog=quiet",
+        "-f",
+        "null",
+        "-",
+    ]
+    result = subprocess.run(
+        command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True
+    )
+    stderr: str = result.stderr.decode(errors="replace")
+    matches = re.findall(r"I:\s+(-?[\d.]+) LUFS", stderr)
+    if not matches:
+        raise ValueError(f"ラウドネスを測定できませんでした: {input_file}")
+    return float(matches[-1])
+
+
+def normalize_loudness_file(
+    input_file: str, output_file: str, loudness_target: float
+) -> None:
+    """
+    音声ファイルのラウドネスを測定し、ターゲット値との差分のゲインを適用して保存します。
+
+    測定とゲインの適用はどちらも ffmpeg のストリーム処理で行います。
+    """
+    loudness: float = measure_loudness(input_file)
+    if loudness <= SILENCE_LOUDNESS:
+        # 無音のファイルは測定値が下限に張り付くため、増幅してノイズを持ち上げないようにする
+        gain: float = 0.0
+    else:
+        gain = loudness_target - loudness
+    command: list[str] = [
+        "ffmpeg",
+        "-nostdin",
+        "-v",
+        "error",
+        "-y",
+        "-i",
+        input_file,
+        "-af",
+        f"volume={gain:.2f}dB",
+        output_file,
+    ]
+    subprocess.run(command, check=True)
+
+
+def normalize_loudness_files(
+    jobs: list[tuple[str, str]], loudness_target: float, workers: int
+) -> None:
+    """
+    (入力ファイル, 出力ファイル) の組ごとにラウドネス正規化を並列に適用します。
+
+    処理の本体は ffmpeg の子プロセスのため、スレッドで並列化します。
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for _ in executor.map(
+            lambda job: normalize_loudness_file(job[0], job[1], loudness_target),
+            jobs,
+        ):
+            pass
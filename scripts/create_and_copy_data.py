@@ -1,7 +1,17 @@
 import os
+import time
+import hashlib
 import argparse
 import shutil
 from argparse import Namespace
+from typing import Optional
+
+# コピー済みかどうかの判定方法
+COMPARE_MODES: tuple[str, ...] = ("mtime", "checksum")
+# 更新日時を比較する際の許容誤差（秒）。FAT やネットワーク共有の分解能に合わせています。
+MTIME_TOLERANCE: float = 2.0
+# ハッシュ計算・フォールバック時のコピーの読み込み単位（バイト）
+BLOCK_SIZE: int = 8 * 1024 * 1024
 
 
 def parse_arguments() -> Namespace:
@@ -26,29 +36,182 @@ def parse_arguments() -> Namespace:
         action="store_true",
         help="[OPTION] 同名のファイルがある場合に強制的に上書きします。",
     )
+    parser.add_argument(
+        "--copy-workers",
+        type=int,
+        default=4,
+        help="[OPTION] 並列にコピーするファイル数。デフォルトは 4 です。",
+    )
+    parser.add_argument(
+        "--copy-compare",
+        choices=COMPARE_MODES,
+        default="mtime",
+        help="[OPTION] コピー済みかどうかの判定方法。'mtime' はサイズと更新日時、"
+        "'checksum' は SHA-256 で比較します。コピー後の検証は、'mtime' ではサイズとコピー中に"
+        "コピー元が変更されていないことのみ、'checksum' では SHA-256 も確認します。デフォルトは 'mtime' です。",
+    )
     return parser.parse_args()
 
 
+def file_checksum(path: str) -> str:
+    """
+    ファイルの内容の SHA-256 ハッシュを計算します。
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def compare_copy(
+    source_file: str, dest_file: str, compare: str
+) -> tuple[bool, Optional[str]]:
+    """
+    コピーが必要かどうかと、計算した場合はコピー元の SHA-256 ハッシュを返します。
+
+    コピー先が存在しないか、コピー元と内容が異なる場合にコピーが必要と判定します。
+    """
+    if not os.path.exists(dest_file):
+        return True, None
+    source_stat = os.stat(source_file)
+    dest_stat = os.stat(dest_file)
+    if source_stat.st_size != dest_stat.st_size:
+        return True, None
+    if compare == "checksum":
+        source_digest: str = file_checksum(source_file)
+        return source_digest != file_checksum(dest_file), source_digest
+    return abs(source_stat.st_mtime - dest_stat.st_mtime) > MTIME_TOLERANCE, None
+
+
+def needs_copy(source_file: str, dest_file: str, compare: str) -> bool:
+    """
+    コピー先が存在しないか、コピー元と内容が異なる場合に True を返します。
+    """
+    return compare_copy(source_file, dest_file, compare)[0]
+
+
+def copy_contents(source_fd: int, dest_fd: int, size: int) -> None:
+    """
+    ファイルの内容をコピーします。
+
+    copy_file_range、sendfile の順にカーネル内でのコピーを試し、
+    どちらも使用できないファイルシステムではユーザー空間でコピーします。
+    """
+    for kernel_copy in ("copy_file_range", "sendfile"):
+        copy = getattr(os, kernel_copy, None)
+        if copy is None:
+            continue
+        offset: int = 0
+        try:
+            while offset < size:
+                if kernel_copy == "copy_file_range":
+                    copied: int = copy(source_fd, dest_fd, size - offset)
+                else:
+                    copied = copy(dest_fd, source_fd, offset, size - offset)
+                if copied == 0:
+                    break
+                offset += copied
+        except OSError:
+            if offset == 0:
+                continue
+            raise
+        if offset == size:
+            return
+        if offset == 0:
+            # 一部の仮想ファイルシステムでは、エラーにならずに 0 バイトを返すため次の方法を試す
+            continue
+        raise OSError(f"コピーが途中で終了しました: {offset}/{size} バイト")
+
+    with os.fdopen(os.dup(source_fd), "rb") as source, os.fdopen(
+        os.dup(dest_fd), "wb"
+    ) as dest:
+        shutil.copyfileobj(source, dest, BLOCK_SIZE)
+
+
+def copy_file(
+    source_file: str, raw_dir: str, force: bool, compare: str = "mtime"
+) -> tuple[bool, int]:
+    """
+    音声ファイルを raw ディレクトリにコピーし、コピーしたかどうかとコピーしたバイト数を返します。
+
+    一時ファイルに書き込んで検証してから置き換えるため、コピー途中のファイルが raw ディレクトリに残ることはありません。
+    検証では、コピー中にコピー元のサイズや更新日時が変わっていないことと、一時ファイルのサイズを確認します。
+    compare が 'checksum' の場合は、一時ファイルの SHA-256 もコピー元と比較します。
+    """
+    dest_file = os.path.join(raw_dir, os.path.basename(source_file))
+    source_digest: Optional[str] = None
+    if not force:
+        copy_needed, source_digest = compare_copy(source_file, dest_file, compare)
+        if not copy_needed:
+            print(f"スキップされたファイル: {dest_file}（既に存在します）")
+            return False, 0
+
+    tmp_file = os.path.join(raw_dir, f".{os.path.basename(source_file)}.part")
+    try:
+        with open(source_file, "rb") as source, open(tmp_file, "wb") as dest:
+            source_stat = os.fstat(source.fileno())
+            copy_contents(source.fileno(), dest.fileno(), source_stat.st_size)
+            copied_stat = os.fstat(source.fileno())
+        # 次回のサイズと更新日時による判定のため、更新日時を引き継ぐ
+        shutil.copystat(source_file, tmp_file)
+        if (copied_stat.st_size, copied_stat.st_mtime_ns) != (
+            source_stat.st_size,
+            source_stat.st_mtime_ns,
+        ):
+            raise OSError(f"コピー中にコピー元が変更されました: {source_file}")
+        if os.path.getsize(tmp_file) != source_stat.st_size:
+            raise OSError(f"コピー後のサイズが一致しません: {source_file}")
+        if compare == "checksum":
+            if source_digest is None:
+                source_digest = file_checksum(source_file)
+            if file_checksum(tmp_file) != source_digest:
+                raise OSError(f"コピー後のチェックサムが一致しません: {source_file}")
+        os.replace(tmp_file, dest_file)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    print(f"コピーされたファイル: {dest_file}")
+    return True, source_stat.st_size
+
+
 def main(args=None):
     """
     メイン関数。音声ファイルを指定のディレクトリにコピーします。
     """
+    from concurrent.futures import ThreadPoolExecutor
+
     if args is None:
         args = parse_arguments()
 
     if args.copy_source_raw_directory:
         raw_dir = os.path.join(f"./data/{args.model_name}", "raw")
         os.makedirs(raw_dir, exist_ok=True)
-        for file in os.listdir(args.copy_source_raw_directory):
-            if file.endswith((".mp3", ".wav")):
-                dest_file = os.path.join(raw_dir, file)
-                if os.path.exists(dest_file) and not args.force_file_copy:
-                    print(f"スキップされたファイル: {dest_file}（既に存在します）")
-                else:
-                    shutil.copy(
-                        os.path.join(args.copy_source_raw_directory, file), dest_file
-                    )
-                    print(f"コピーされたファイル: {dest_file}")
+        sources = [
+            os.path.join(args.copy_source_raw_directory, file)
+            for file in sorted(os.listdir(args.copy_source_raw_directory))
+            if file.endswith((".mp3", ".wav"))
+        ]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, args.copy_workers)) as executor:
+            copied = list(
+                executor.map(
+                    lambda source: copy_file(
+                        source, raw_dir, args.force_file_copy, args.copy_compare
+                    ),
+                    sources,
+                )
+            )
+        elapsed = time.perf_counter() - started
+        copied_files = sum(1 for done, _ in copied if done)
+        total_bytes = sum(size for _, size in copied)
+        if copied_files:
+            print(
+                f"コピーしたファイル: {copied_files} 件、"
+                f"{total_bytes / 1024 / 1024:.1f} MB、"
+                f"{total_bytes / 1024 / 1024 / max(elapsed, 1e-9):.1f} MB/s"
+            )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,166 @@
+import os
+import json
+import shutil
+import hashlib
+from typing import TYPE_CHECKING, Iterator, Optional
+from scripts.audio_stream import iter_audio_chunks
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# 1 エントリあたりの音声の長さ（秒）。Whisper の入力窓と同じ長さです。
+CHUNK_SECONDS: float = 30.0
+# ファイル名とコンテンツハッシュの対応を保存するインデックスファイル
+INDEX_FILE: str = "index.json"
+# ハッシュ計算時の読み込み単位（バイト）
+HASH_BLOCK_SIZE: int = 1024 * 1024
+
+
+def content_hash(input_file: str) -> str:
+    """
+    ファイルの内容の SHA-256 ハッシュを計算します。
+    """
+    digest = hashlib.sha256()
+    with open(input_file, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_index(store_dir: str) -> dict:
+    """
+    インデックスファイルを読み込みます。存在しない場合は空の辞書を返します。
+    """
+    index_file: str = os.path.join(store_dir, INDEX_FILE)
+    if not os.path.exists(index_file):
+        return {}
+    with open(index_file) as f:
+        return json.load(f)
+
+
+def save_index(store_dir: str, index: dict) -> None:
+    """
+    インデックスファイルを保存します。
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    index_file: str = os.path.join(store_dir, INDEX_FILE)
+    # 監視モードと一括実行が同じストアを使う場合に一時ファイルを取り合わないよう、プロセスごとに分ける。
+    # 他のプロセスの更新を上書きしても、失われるのはハッシュの記録だけで、次回に再計算される
+    tmp_file: str = f"{index_file}.tmp{os.getpid()}"
+    with open(tmp_file, "w") as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, index_file)
+
+
+def lookup_hash(input_file: str, index: dict) -> str:
+    """
+    ファイルのコンテンツハッシュを返します。
+
+    サイズと更新日時がインデックスと一致する場合は、ハッシュを再計算しません。
+    """
+    stat = os.stat(input_file)
+    name: str = os.path.basename(input_file)
+    entry: Optional[dict] = index.get(name)
+    if (
+        entry is not None
+        and entry["size"] == stat.st_size
+        and entry["mtime_ns"] == stat.st_mtime_ns
+    ):
+        return entry["hash"]
+    digest: str = content_hash(input_file)
+    index[name] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": digest}
+    return digest
+
+
+def compute_log_mel(chunk: "np.ndarray", n_mels: int) -> "np.ndarray":
+    """
+    30 秒の音声チャンクから、30 秒分にパディングした log-mel スペクトログラムを計算します。
+    """
+    import whisper
+
+    mel = whisper.log_mel_spectrogram(chunk, n_mels, padding=whisper.audio.N_SAMPLES)
+    return whisper.pad_or_trim(mel, whisper.audio.N_FRAMES).cpu().numpy()
+
+
+def iter_log_mel(input_file: str, n_mels: int) -> Iterator["np.ndarray"]:
+    """
+    音声ファイルを 30 秒ごとに読み込み、log-mel スペクトログラムを計算して返します。
+    """
+    for chunk in iter_audio_chunks(input_file, CHUNK_SECONDS):
+        yield compute_log_mel(chunk, n_mels)
+
+
+def entry_dir(store_dir: str, digest: str, n_mels: int) -> str:
+    """
+    コンテンツハッシュとメルビン数に対応するエントリのディレクトリを返します。
+    """
+    return os.path.join(store_dir, f"{digest}_{n_mels}")
+
+
+def load_features(
+    input_file: str, n_mels: int, store_dir: str
+) -> Iterator["np.ndarray"]:
+    """
+    音声ファイルの log-mel スペクトログラムを 30 秒ごとに返します。
+
+    ストアにエントリがあればメモリマップで読み込み、無ければ計算してストアに保存します。
+    エントリはコンテンツハッシュとメルビン数をキーとするため、メルビン数が同じ
+    Whisper モデル間や再実行時に再利用されます。
+    """
+    import numpy as np
+
+    index: dict = load_index(store_dir)
+    digest: str = lookup_hash(input_file, index)
+    save_index(store_dir, index)
+    target_dir: str = entry_dir(store_dir, digest, n_mels)
+
+    if not os.path.isdir(target_dir):
+        # 計算途中のエントリを読み込まないよう、一時ディレクトリに書き込んでから置き換える
+        tmp_dir: str = f"{target_dir}.tmp{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        try:
+            written: int = 0
+            for number, mel in enumerate(iter_log_mel(input_file, n_mels)):
+                np.save(os.path.join(tmp_dir, f"{number:05d}.npy"), mel)
+                written += 1
+            if written == 0:
+                raise ValueError(f"音声データを読み込めませんでした: {input_file}")
+        except BaseException:
+            # 失敗した結果をエントリとして残すと、以降の実行で再計算されなくなる
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        try:
+            os.rename(tmp_dir, target_dir)
+        except OSError:
+            # 別のプロセスが先に同じエントリを保存した場合
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    for file in sorted(os.listdir(target_dir)):
+        yield np.load(os.path.join(target_dir, file), mmap_mode="r")
+
+
+def evict_features(store_dir: str, audio_dir: str) -> None:
+    """
+    audio_dir に存在しなくなった音声ファイルのエントリをストアから削除します。
+    """
+    if not os.path.isdir(store_dir):
+        return
+    index: dict = load_index(store_dir)
+    live_hashes: set[str] = set()
+    live_names: set[str] = set()
+    for file in sorted(os.listdir(audio_dir)):
+        if file.endswith((".mp3", ".wav")):
+            live_names.add(file)
+            live_hashes.add(lookup_hash(os.path.join(audio_dir, file), index))
+    for name in set(index) - live_names:
+        del index[name]
+    save_index(store_dir, index)
+
+    for entry in sorted(os.listdir(store_dir)):
+        path: str = os.path.join(store_dir, entry)
+        if not os.path.isdir(path):
+            continue
+        if entry.split("_")[0] not in live_hashes:
+            shutil.rmtree(path, ignore_errors=True)
+            print(f"削除された特徴量: {path}")
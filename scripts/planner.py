@@ -0,0 +1,405 @@
+import os
+import json
+import time
+import contextlib
+from argparse import Namespace
+from typing import Iterator, Optional
+from scripts.audio_stream import probe_duration
+from scripts.create_and_copy_data import needs_copy
+from scripts.separate import format_time, get_audio_duration, plan_segments
+
+# ステージごとの処理速度を記録するファイル。マシン固有の値のため、モデル間で共有します。
+PROFILE_FILE: str = "./data/throughput_profile.json"
+# 計画の対象となるステージ（実行順）
+STAGES: tuple[str, ...] = ("copy", "separate", "normalize", "transcribe", "stage")
+# 処理速度をバイト数で見積もるステージ。それ以外は音声の長さ（秒）で見積もります。
+BYTE_RATE_STAGES: tuple[str, ...] = ("copy", "stage")
+# ファイル単位で並列に処理するステージと、その並列数を指定する引数の名前
+PARALLEL_STAGES: dict[str, str] = {
+    "copy": "copy_workers",
+    "normalize": "normalize_workers",
+}
+AUDIO_EXTENSIONS: tuple[str, ...] = (".mp3", ".wav")
+
+
+def load_profile(profile_file: str = PROFILE_FILE) -> dict:
+    """
+    処理速度の記録を読み込みます。存在しない場合は空の辞書を返します。
+    """
+    if not os.path.exists(profile_file):
+        return {}
+    with open(profile_file) as f:
+        return json.load(f)
+
+
+def record_throughput(
+    stage: str,
+    wall_seconds: float,
+    audio_seconds: float,
+    bytes_out: int,
+    profile_file: str = PROFILE_FILE,
+) -> None:
+    """
+    ステージの処理量と所要時間を処理速度の記録に加算します。
+    """
+    profile: dict = load_profile(profile_file)
+    entry: dict = profile.setdefault(
+        stage, {"runs": 0, "wall_seconds": 0.0, "audio_seconds": 0.0, "bytes_out": 0}
+    )
+    entry["runs"] += 1
+    entry["wall_seconds"] += wall_seconds
+    entry["audio_seconds"] += audio_seconds
+    entry["bytes_out"] += bytes_out
+    os.makedirs(os.path.dirname(profile_file) or ".", exist_ok=True)
+    with open(profile_file + ".tmp", "w") as f:
+        json.dump(profile, f, ensure_ascii=False, indent=2)
+    os.replace(profile_file + ".tmp", profile_file)
+
+
+def snapshot(directory: str, extensions: tuple[str, ...]) -> dict:
+    """
+    ディレクトリ配下のファイルのサイズ・更新日時・inode 番号を返します。
+    """
+    files: dict = {}
+    if not os.path.isdir(directory):
+        return files
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if name.endswith(extensions):
+                stat = os.stat(os.path.join(root, name))
+                files[os.path.join(root, name)] = (
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    stat.st_ino,
+                )
+    return files
+
+
+def find_audio(audio_dir: str, stem: str) -> Optional[str]:
+    """
+    audio_dir から拡張子を除いた名前が stem の音声ファイルを探します。
+    """
+    for extension in AUDIO_EXTENSIONS:
+        path: str = os.path.join(audio_dir, stem + extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+@contextlib.contextmanager
+def profile_stage(
+    stage: str,
+    output_dir: str,
+    extensions: tuple[str, ...] = AUDIO_EXTENSIONS,
+    audio_dir: Optional[str] = None,
+    workers: int = 1,
+) -> Iterator[None]:
+    """
+    ステージの実行前後で output_dir を比較し、新しく生成されたファイルから処理速度を記録します。
+
+    audio_dir を指定した場合、生成されたファイルと同名の音声ファイルを audio_dir から探して
+    音声の長さを求めます（文字起こしのように出力が音声でないステージ向け）。
+    workers 個のファイルを並列に処理したステージは、1 ファイルずつ処理した場合の処理速度に換算して記録します。
+    生成されたファイルが workers より少ない場合は、ファイル数を並列数とみなします。
+    """
+    before: dict = snapshot(output_dir, extensions)
+    started: float = time.perf_counter()
+    yield
+    wall_seconds: float = time.perf_counter() - started
+    after: dict = snapshot(output_dir, extensions)
+
+    produced: list[str] = [path for path, sig in after.items() if before.get(path) != sig]
+    if not produced:
+        return
+    audio_seconds: float = 0.0
+    for path in produced:
+        audio_file: Optional[str] = path
+        if audio_dir is not None:
+            audio_file = find_audio(
+                audio_dir, os.path.splitext(os.path.basename(path))[0]
+            )
+        if audio_file is None or not audio_file.endswith(AUDIO_EXTENSIONS):
+            continue
+        try:
+            audio_seconds += probe_duration(audio_file)
+        except (OSError, ValueError):
+            # 長さを取得できないファイルがあっても、ステージの処理自体は失敗させない
+            continue
+    record_throughput(
+        stage,
+        wall_seconds * max(1, min(workers, len(produced))),
+        audio_seconds,
+        sum(after[path][0] for path in produced),
+    )
+
+
+def new_work() -> dict:
+    """
+    1 ステージ分の処理量を表す辞書を返します。
+    """
+    return {"files": 0, "audio_seconds": 0.0, "bytes": 0}
+
+
+def add_work(work: dict, audio_seconds: float, size: int) -> None:
+    """
+    処理量に 1 ファイル分を加算します。
+    """
+    work["files"] += 1
+    work["audio_seconds"] += audio_seconds
+    work["bytes"] += int(size)
+
+
+def list_tracks(dirs: dict, pending: dict) -> dict:
+    """
+    分割の対象となる音声ファイル（コピー済み、およびコピー予定のファイル）を返します。
+
+    pending はコピー予定のファイル名から (パス, 長さ（秒）, サイズ) への辞書で、
+    コピー後に raw ディレクトリに置かれる内容として raw の既存ファイルより優先します。
+    戻り値はファイル名から (パス, 長さ（秒）, サイズ) への辞書です。
+    """
+    tracks: dict = {
+        file: (path, int(duration), size)
+        for file, (path, duration, size) in pending.items()
+    }
+    if os.path.isdir(dirs["raw"]):
+        for file in sorted(os.listdir(dirs["raw"])):
+            if file.endswith(AUDIO_EXTENSIONS) and file not in tracks:
+                path: str = os.path.join(dirs["raw"], file)
+                tracks[file] = (
+                    path,
+                    get_audio_duration(path),
+                    os.path.getsize(path),
+                )
+    return tracks
+
+
+def probe_directory(directory: str) -> dict:
+    """
+    ディレクトリ内の音声ファイルの長さ（秒）とサイズを返します。
+
+    戻り値はファイル名から (長さ, サイズ) への辞書です。
+    """
+    files: dict = {}
+    if os.path.isdir(directory):
+        for file in sorted(os.listdir(directory)):
+            if file.endswith(AUDIO_EXTENSIONS):
+                path: str = os.path.join(directory, file)
+                files[file] = (probe_duration(path), os.path.getsize(path))
+    return files
+
+
+def take_inventory(args: Namespace, dirs: dict) -> dict:
+    """
+    計画に必要なファイルの長さとサイズを調べます。
+
+    ファイルの長さの取得は ffprobe を起動するため、各ファイルにつき一度だけ行い、
+    分割の設定を変えて比較する場合も再利用します。
+    """
+    copy: dict = new_work()
+    pending: dict = {}
+    if args.copy_source_raw_directory and os.path.isdir(args.copy_source_raw_directory):
+        for file in sorted(os.listdir(args.copy_source_raw_directory)):
+            if not file.endswith(AUDIO_EXTENSIONS):
+                continue
+            path: str = os.path.join(args.copy_source_raw_directory, file)
+            dest_file: str = os.path.join(dirs["raw"], file)
+            if not args.force_copy and not needs_copy(
+                path, dest_file, args.copy_compare
+            ):
+                continue
+            pending[file] = (path, probe_duration(path), os.path.getsize(path))
+            add_work(copy, *pending[file][1:])
+    return {
+        "copy": copy,
+        "tracks": list_tracks(dirs, pending),
+        "separated": probe_directory(dirs["separate"]),
+        "normalized": probe_directory(dirs["normalize"]),
+    }
+
+
+def plan_work(
+    args: Namespace, dirs: dict, inventory: dict, term: int, overlay: int
+) -> dict:
+    """
+    パイプライン全体を実行した場合に、各ステージで処理が必要な量を見積もります。
+
+    既存の出力ファイルの有無から、実際の実行と同じ条件でスキップされるファイルを除外します。
+    ファイルの長さとサイズは take_inventory の結果を使用します。
+    """
+    work: dict = {stage: new_work() for stage in STAGES}
+
+    # ファイルコピー
+    work["copy"] = dict(inventory["copy"])
+
+    # ファイル分割。分割後のファイルのサイズは元ファイルのビットレートから見積もる
+    segments: dict = dict(inventory["separated"])
+    for _, (path, duration, size) in inventory["tracks"].items():
+        bytes_per_second: float = size / duration if duration else 0.0
+        for name, start, end in plan_segments(
+            path, duration, args.start, term, overlay
+        ):
+            if name in segments:
+                continue
+            segments[name] = (end - start, (end - start) * bytes_per_second)
+            add_work(work["separate"], *segments[name])
+
+    # ラウドネス正規化。正規化済みのフラグがある場合は実行されない
+    normalized: dict = dict(inventory["normalized"])
+    flag_file: str = os.path.join(dirs["normalize"], ".normalized")
+    if not os.path.exists(flag_file) or args.force_normalize:
+        for name, (audio_seconds, size) in segments.items():
+            normalized[name] = (audio_seconds, size)
+            add_work(work["normalize"], audio_seconds, size)
+
+    # 文字起こしと、before_text_reformatting への配置
+    for name, (audio_seconds, size) in normalized.items():
+        stem: str = os.path.splitext(name)[0]
+        label: str = os.path.join(
+            dirs["transcribe"], f"{stem}.{args.transcription_extension}"
+        )
+        if not os.path.exists(label) or args.force_transcribe:
+            add_work(work["transcribe"], audio_seconds, size)
+        segment_dir: str = "_".join(stem.split("_")[-2:])
+        staged: str = os.path.join(dirs["before_text_reformatting"], segment_dir, name)
+        if not os.path.exists(staged) or args.force_before_text_reformatting:
+            add_work(work["stage"], audio_seconds, size)
+    return work
+
+
+def profile_key(stage: str, args: Namespace) -> str:
+    """
+    処理速度の記録を参照するキーを返します。文字起こしはモデルとバックエンドごとに記録します。
+    """
+    if stage == "transcribe":
+        return f"transcribe:{args.whisper_model_name}:{args.whisper_backend}"
+    return stage
+
+
+def stage_workers(args: Namespace, copy_workers: Optional[int] = None) -> dict:
+    """
+    並列に処理するステージごとの並列数を返します。copy_workers を指定した場合はコピーの並列数を置き換えます。
+    """
+    workers: dict = {
+        stage: max(1, getattr(args, attribute))
+        for stage, attribute in PARALLEL_STAGES.items()
+    }
+    if copy_workers is not None:
+        workers["copy"] = max(1, copy_workers)
+    return workers
+
+
+def estimate(stage: str, work: dict, profile: dict, workers: dict) -> dict:
+    """
+    処理速度の記録から、ステージの所要時間（秒）とディスク使用量（バイト）を見積もります。
+
+    処理速度は 1 ファイルずつ処理した場合の値として扱い、並列に処理するステージは
+    workers に指定した並列数（ファイル数が少ない場合はファイル数）に比例して短縮されるとみなします。
+    記録が無い場合は None を返します。
+    """
+    entry: Optional[dict] = profile.get(stage)
+    if entry is None or entry["wall_seconds"] <= 0:
+        return {"seconds": None, "disk": None}
+    if stage in BYTE_RATE_STAGES:
+        rate: float = entry["bytes_out"] / entry["wall_seconds"]
+        seconds: Optional[float] = work["bytes"] / rate if rate else None
+    else:
+        rate = entry["audio_seconds"] / entry["wall_seconds"]
+        seconds = work["audio_seconds"] / rate if rate else None
+    if seconds is not None and stage in workers:
+        seconds /= max(1, min(workers[stage], work["files"]))
+    disk: Optional[float] = None
+    if entry["audio_seconds"] > 0:
+        disk = work["audio_seconds"] * entry["bytes_out"] / entry["audio_seconds"]
+    return {"seconds": seconds, "disk": disk}
+
+
+def format_seconds(seconds: Optional[float]) -> str:
+    """
+    見積もり時間を hh:mm:ss の形式にフォーマットします。
+    """
+    return "不明" if seconds is None else format_time(int(round(seconds)))
+
+
+def format_bytes(size: Optional[float]) -> str:
+    """
+    バイト数を MB 単位にフォーマットします。
+    """
+    return "不明" if size is None else f"{size / 1024 / 1024:.1f} MB"
+
+
+def summarize(work: dict, profile: dict, workers: dict) -> tuple:
+    """
+    全ステージの所要時間とディスク使用量の合計を返します。見積もれないステージがあれば None を返します。
+    """
+    total_seconds: Optional[float] = 0.0
+    total_disk: Optional[float] = 0.0
+    for stage in STAGES:
+        if work[stage]["files"] == 0:
+            continue
+        result: dict = estimate(stage, work[stage], profile, workers)
+        if result["seconds"] is None or total_seconds is None:
+            total_seconds = None
+        else:
+            total_seconds += result["seconds"]
+        if result["disk"] is None or total_disk is None:
+            total_disk = None
+        else:
+            total_disk += result["disk"]
+    return total_seconds, total_disk
+
+
+def main(args: Namespace, dirs: dict) -> None:
+    """
+    何も処理せずに、各ステージの処理量と所要時間・ディスク使用量の見積もりを表示します。
+    """
+    profile: dict = load_profile()
+    keyed: dict = {stage: profile.get(profile_key(stage, args)) for stage in STAGES}
+    profile = {stage: entry for stage, entry in keyed.items() if entry is not None}
+
+    inventory: dict = take_inventory(args, dirs)
+    workers: dict = stage_workers(args)
+    work: dict = plan_work(args, dirs, inventory, args.term, args.overlay)
+    print(f"実行計画（--term {args.term} --overlay {args.overlay}）")
+    print(
+        f"{'stage':<12}{'files':>8}{'audio':>12}{'size':>14}{'time':>12}{'disk':>14}"
+    )
+    for stage in STAGES:
+        result: dict = estimate(stage, work[stage], profile, workers)
+        print(
+            f"{stage:<12}"
+            f"{work[stage]['files']:>8}"
+            f"{format_seconds(work[stage]['audio_seconds']):>12}"
+            f"{format_bytes(work[stage]['bytes']):>14}"
+            f"{format_seconds(result['seconds']):>12}"
+            f"{format_bytes(result['disk']):>14}"
+        )
+    missing: list[str] = [
+        profile_key(stage, args)
+        for stage in STAGES
+        if work[stage]["files"] and stage not in profile
+    ]
+    if missing:
+        print(f"処理速度の記録が無いステージ: {', '.join(missing)}（{PROFILE_FILE}）")
+
+    print()
+    print("設定ごとの見積もり")
+    print(
+        f"{'term':>6}{'overlay':>9}{'copy_workers':>14}{'segments':>10}"
+        f"{'transcribe':>12}{'time':>12}{'disk':>14}"
+    )
+    for term in args.plan_terms or [args.term]:
+        for overlay in args.plan_overlays or [args.overlay]:
+            if term <= overlay:
+                continue
+            scenario: dict = plan_work(args, dirs, inventory, term, overlay)
+            for copy_workers in args.plan_workers or [args.copy_workers]:
+                total_seconds, total_disk = summarize(
+                    scenario, profile, stage_workers(args, copy_workers)
+                )
+                print(
+                    f"{term:>6}{overlay:>9}{copy_workers:>14}"
+                    f"{scenario['separate']['files']:>10}"
+                    f"{format_seconds(scenario['transcribe']['audio_seconds']):>12}"
+                    f"{format_seconds(total_seconds):>12}"
+                    f"{format_bytes(total_disk):>14}"
+                )
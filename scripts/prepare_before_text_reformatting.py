@@ -1,9 +1,16 @@
 import os
+import sys
 import shutil
 import argparse
 from argparse import Namespace
 from typing import Optional
 
+if not __package__:
+    # python scripts/prepare_before_text_reformatting.py として直接実行された場合も scripts パッケージを読み込めるようにする
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.quality_gate import check_segment, write_report
+
 
 def parse_arguments() -> Namespace:
     """
@@ -20,12 +27,22 @@ def parse_arguments() -> Namespace:
         action="store_true",
         help="[OPTION] before_text_reformatting を強制します。",
     )
+    parser.add_argument(
+        "--disable-quality-gate",
+        action="store_true",
+        help="[OPTION] 文字起こし結果の品質による除外を行わずに、すべてのセグメントを配置します。",
+    )
     return parser.parse_args()
 
 
-def prepare_before_text_reformatting(model_name: str, force: bool) -> None:
+def prepare_before_text_reformatting(
+    model_name: str, force: bool, quality_gate: bool = True
+) -> None:
     """
     fine tuning 前のデータセットを作成します。
+
+    quality_gate が True の場合、無音・低信頼度・繰り返しなどの文字起こし結果を持つセグメントを除外し、
+    除外したセグメントとその理由を ./data/{model_name}/quality_report.json に書き込みます。
     """
     before_text_reformatting_dir = os.path.join(
         f"./data/{model_name}", "before_text_reformatting"
@@ -34,32 +51,84 @@ def prepare_before_text_reformatting(model_name: str, force: bool) -> None:
     transcribe_dir = os.path.join(f"./data/{model_name}", "transcriptions")
     os.makedirs(before_text_reformatting_dir, exist_ok=True)
 
+    pruned: dict = {}
+    kept: list[str] = []
     for file in sorted(os.listdir(normalize_dir)):
         if file.endswith((".mp3", ".wav")):
-            base_name, ext = os.path.splitext(file)
-            segment_number = base_name.split("_")[-2]
-            time_part = base_name.split("_")[-1]
-            segment_dir = os.path.join(
-                before_text_reformatting_dir, f"{segment_number}_{time_part}"
+            reasons: list[str] = stage_file(
+                file,
+                normalize_dir,
+                transcribe_dir,
+                before_text_reformatting_dir,
+                force,
+                quality_gate,
             )
-            os.makedirs(segment_dir, exist_ok=True)
+            if reasons:
+                pruned[file] = reasons
+            else:
+                kept.append(file)
 
-            audio_src = os.path.join(normalize_dir, file)
-            audio_dest = os.path.join(segment_dir, file)
-            text_src = os.path.join(transcribe_dir, f"{base_name}.lab")
-            text_dest = os.path.join(segment_dir, f"{base_name}.lab")
+    if quality_gate:
+        report_file: str = os.path.join(f"./data/{model_name}", "quality_report.json")
+        write_report(report_file, pruned, kept)
+        print(
+            f"品質チェックの結果を保存しました: {report_file}"
+            f"（配置: {len(kept)}、除外: {len(pruned)}）"
+        )
 
-            if os.path.exists(audio_dest) and not force:
-                print(f"スキップされた音声ファイル: {audio_dest}（既に存在します）")
-            else:
-                shutil.copy(audio_src, audio_dest)
-                print(f"コピーされた音声ファイル: {audio_dest}")
 
-            if os.path.exists(text_dest) and not force:
-                print(f"スキップされたテキストファイル: {text_dest}（既に存在します）")
-            else:
-                shutil.copy(text_src, text_dest)
-                print(f"コピーされたテキストファイル: {text_dest}")
+def stage_file(
+    file: str,
+    normalize_dir: str,
+    transcribe_dir: str,
+    before_text_reformatting_dir: str,
+    force: bool,
+    quality_gate: bool = True,
+) -> list[str]:
+    """
+    正規化済みの音声ファイルとテキストファイルを、セグメントごとのディレクトリにコピーします。
+
+    quality_gate が True で文字起こし結果が品質チェックを通らない場合は配置せず、
+    既に配置されたファイルを削除して、除外した理由の一覧を返します。
+    """
+    base_name, ext = os.path.splitext(file)
+    segment_number = base_name.split("_")[-2]
+    time_part = base_name.split("_")[-1]
+    segment_dir = os.path.join(
+        before_text_reformatting_dir, f"{segment_number}_{time_part}"
+    )
+
+    audio_src = os.path.join(normalize_dir, file)
+    audio_dest = os.path.join(segment_dir, file)
+    text_src = os.path.join(transcribe_dir, f"{base_name}.lab")
+    text_dest = os.path.join(segment_dir, f"{base_name}.lab")
+
+    if quality_gate:
+        reasons: list[str] = check_segment(text_src)
+        if reasons:
+            for path in (audio_dest, text_dest):
+                if os.path.exists(path):
+                    os.remove(path)
+            # セグメントのディレクトリは他の音声ファイルと共有されるため、空になった場合のみ削除する
+            if os.path.isdir(segment_dir) and not os.listdir(segment_dir):
+                os.rmdir(segment_dir)
+            print(f"除外されたセグメント: {file}（{', '.join(reasons)}）")
+            return reasons
+
+    os.makedirs(segment_dir, exist_ok=True)
+
+    if os.path.exists(audio_dest) and not force:
+        print(f"スキップされた音声ファイル: {audio_dest}（既に存在します）")
+    else:
+        shutil.copy(audio_src, audio_dest)
+        print(f"コピーされた音声ファイル: {audio_dest}")
+
+    if os.path.exists(text_dest) and not force:
+        print(f"スキップされたテキストファイル: {text_dest}（既に存在します）")
+    else:
+        shutil.copy(text_src, text_dest)
+        print(f"コピーされたテキストファイル: {text_dest}")
+    return []
 
 
 def main(args: Optional[Namespace] = None) -> None:
@@ -70,7 +139,9 @@ def main(args: Optional[Namespace] = None) -> None:
         args = parse_arguments()
 
     prepare_before_text_reformatting(
-        args.model_name, args.force_before_text_reformatting
+        args.model_name,
+        args.force_before_text_reformatting,
+        not args.disable_quality_gate,
     )
 
 
@@ -0,0 +1,162 @@
+import os
+import json
+import zlib
+from typing import Optional
+from scripts.speech_to_text import COMPRESSION_RATIO_THRESHOLD, LOGPROB_THRESHOLD
+
+# これより短いテキストは学習データとして使用しません（空白を除いた文字数）。
+MIN_TEXT_LENGTH: int = 2
+# 同じ文字の連続がこの長さ以上のテキストは、繰り返しとみなします。
+MAX_CHARACTER_RUN: int = 10
+# 無音区間で Whisper が出力しやすい定型文
+HALLUCINATION_PHRASES: tuple[str, ...] = (
+    "ご視聴ありがとうございました",
+    "ご視聴いただきありがとうございます",
+    "チャンネル登録よろしくお願いします",
+    "チャンネル登録お願いします",
+    "字幕は視聴者によって作成されました",
+)
+# 定型文を取り除いた残りがテキストのこの割合以下であれば、定型文のみのテキストとみなします。
+HALLUCINATION_REMAINDER_RATIO: float = 0.2
+# 定型文との比較の前に取り除く句読点と記号
+PUNCTUATION: str = "、。，．,.!?！？「」『』（）()・…〜"
+
+
+def text_compression_ratio(text: str) -> float:
+    """
+    テキストの圧縮率（元のバイト数 ÷ zlib で圧縮したバイト数）を計算します。
+    """
+    data: bytes = text.encode("utf-8")
+    return len(data) / len(zlib.compress(data)) if data else 0.0
+
+
+def longest_character_run(text: str) -> int:
+    """
+    同じ文字が連続する最大の長さを返します。
+    """
+    longest: int = 0
+    current: int = 0
+    previous: Optional[str] = None
+    for char in text:
+        current = current + 1 if char == previous else 1
+        previous = char
+        longest = max(longest, current)
+    return longest
+
+
+def is_hallucination(text: str) -> bool:
+    """
+    テキストが定型文のみ（またはほぼ定型文のみ）で構成されている場合に True を返します。
+
+    実際の発話の中に定型文の一部が含まれているだけのテキストは除外しません。
+    """
+    stripped: str = "".join(char for char in text if char not in PUNCTUATION)
+    if not stripped:
+        return False
+    remainder: str = stripped
+    for phrase in HALLUCINATION_PHRASES:
+        remainder = remainder.replace(phrase, "")
+    return (
+        len(remainder) < len(stripped)
+        and len(remainder) <= len(stripped) * HALLUCINATION_REMAINDER_RATIO
+    )
+
+
+def load_chunks(transcription_file: str) -> Optional[list[dict]]:
+    """
+    文字起こし時に保存された Whisper の指標を読み込みます。存在しない場合は None を返します。
+    """
+    stats_file: str = os.path.splitext(transcription_file)[0] + ".json"
+    if not os.path.exists(stats_file):
+        return None
+    with open(stats_file) as f:
+        return json.load(f)
+
+
+def evaluate(text: str, chunks: Optional[list[dict]]) -> list[str]:
+    """
+    文字起こし結果を評価し、学習データから除外する理由の一覧を返します。
+
+    空の一覧を返した場合、そのセグメントは学習データとして使用できます。
+    """
+    reasons: list[str] = []
+    stripped: str = "".join(text.split())
+
+    if chunks is not None:
+        if chunks and all(chunk["no_speech"] for chunk in chunks):
+            reasons.append("no_speech")
+        spoken: list[dict] = [chunk for chunk in chunks if not chunk["no_speech"]]
+        if any(chunk["avg_logprob"] < LOGPROB_THRESHOLD for chunk in spoken):
+            reasons.append("low_avg_logprob")
+        if any(
+            chunk["compression_ratio"] > COMPRESSION_RATIO_THRESHOLD for chunk in spoken
+        ):
+            reasons.append("high_compression_ratio")
+
+    if len(stripped) < MIN_TEXT_LENGTH:
+        reasons.append("too_short")
+    elif text_compression_ratio(stripped) > COMPRESSION_RATIO_THRESHOLD:
+        reasons.append("repetitive_text")
+    elif longest_character_run(stripped) >= MAX_CHARACTER_RUN:
+        reasons.append("repeated_characters")
+    if is_hallucination(stripped):
+        reasons.append("hallucination_phrase")
+    return reasons
+
+
+def check_segment(transcription_file: str) -> list[str]:
+    """
+    文字起こしファイルを評価し、学習データから除外する理由の一覧を返します。
+    """
+    if not os.path.exists(transcription_file):
+        return ["missing_transcription"]
+    with open(transcription_file) as f:
+        text: str = f.read()
+    return evaluate(text, load_chunks(transcription_file))
+
+
+def write_report(report_file: str, pruned: dict, kept: list[str]) -> None:
+    """
+    除外したセグメントとその理由、配置したセグメントを JSON ファイルに書き込みます。
+    """
+    counts: dict = {}
+    for reasons in pruned.values():
+        for reason in reasons:
+            counts[reason] = counts.get(reason, 0) + 1
+    with open(report_file + ".tmp", "w") as f:
+        json.dump(
+            {
+                "kept": len(kept),
+                "pruned": len(pruned),
+                "reasons": counts,
+                "segments": dict(sorted(pruned.items())),
+                "kept_segments": sorted(kept),
+            },
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+    os.replace(report_file + ".tmp", report_file)
+
+
+def merge_report(report_file: str, pruned: dict, kept: list[str]) -> tuple[int, int]:
+    """
+    既存のレポートに、新たに評価したセグメントの結果を統合して書き込みます。
+
+    同じセグメントを再評価した場合は、新しい結果で置き換えます。戻り値は統合後の配置数と除外数です。
+    """
+    all_pruned: dict = {}
+    all_kept: set[str] = set()
+    if os.path.exists(report_file):
+        with open(report_file) as f:
+            report: dict = json.load(f)
+        all_pruned = report.get("segments", {})
+        all_kept = set(report.get("kept_segments", []))
+    for file in kept:
+        all_pruned.pop(file, None)
+        all_kept.add(file)
+    for file, reasons in pruned.items():
+        all_kept.discard(file)
+        all_pruned[file] = reasons
+    write_report(report_file, all_pruned, sorted(all_kept))
+    return len(all_kept), len(all_pruned)
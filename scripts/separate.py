@@ -1,10 +1,18 @@
 import os
+import re
+import sys
 import argparse
 import subprocess
 from argparse import Namespace
 from typing import Optional
 from datetime import timedelta
 
+if not __package__:
+    # python scripts/separate.py として直接実行された場合も scripts パッケージを読み込めるようにする
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.audio_stream import probe_duration
+
 
 def parse_arguments() -> Namespace:
     """
@@ -63,21 +71,50 @@ def get_audio_duration(input_file: str) -> int:
     """
     音声ファイルの総再生時間を取得します。
     """
-    result = subprocess.run(
-        [
-            "ffprobe",
-            "-v",
-            "error",
-            "-show_entries",
-            "format=duration",
-            "-of",
-            "default=noprint_wrappers=1:nokey=1",
-            input_file,
-        ],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
+    return int(probe_duration(input_file))
+
+
+def list_track_segments(output_dir: str, input_file: str) -> list[str]:
+    """
+    入力音声ファイルから分割されたファイルの一覧を返します。
+    """
+    base_filename: str = os.path.splitext(os.path.basename(input_file))[0]
+    file_extension: str = os.path.splitext(input_file)[1]
+    pattern = re.compile(
+        re.escape(base_filename)
+        + r"_\d{5}_[\d-]+~[\d-]+"
+        + re.escape(file_extension)
     )
-    return int(float(result.stdout))
+    if not os.path.isdir(output_dir):
+        return []
+    return [file for file in sorted(os.listdir(output_dir)) if pattern.fullmatch(file)]
+
+
+def plan_segments(
+    input_file: str, total_duration: int, start_time: int, interval: int, overlay: int
+) -> list[tuple[str, int, int]]:
+    """
+    分割後のファイル名と、各ファイルの開始時間・終了時間（秒）の一覧を返します。
+    """
+    base_filename: str = os.path.splitext(os.path.basename(input_file))[0]
+    file_extension: str = os.path.splitext(input_file)[1]
+    segments: list[tuple[str, int, int]] = []
+    segment_number: int = 1
+    current_time: int = start_time
+    while current_time < total_duration:
+        end_time: int = min(current_time + interval, total_duration)
+        segments.append(
+            (
+                generate_output_filename(
+                    base_filename, segment_number, current_time, end_time, file_extension
+                ),
+                current_time,
+                end_time,
+            )
+        )
+        segment_number += 1
+        current_time += interval - overlay
+    return segments
 
 
 def split_audio_file(
@@ -91,7 +128,6 @@ def split_audio_file(
     """
     音声ファイルを指定の間隔で分割し、出力ディレクトリに保存します。
     """
-    duration: int = interval
     total_duration: int = get_audio_duration(input_file)
 
     # 出力ディレクトリの存在確認
@@ -103,19 +139,9 @@ def split_audio_file(
         print(f"入力ファイルが見つかりません: {input_file}")
         return
 
-    segment_number: int = 1
-    current_time: int = start_time
-
-    while current_time < total_duration:
-        base_filename: str = os.path.splitext(os.path.basename(input_file))[0]
-        file_extension: str = os.path.splitext(input_file)[1]
-        output_filename: str = generate_output_filename(
-            base_filename,
-            segment_number,
-            current_time,
-            min(current_time + duration, total_duration),
-            file_extension,
-        )
+    for output_filename, current_time, end_time in plan_segments(
+        input_file, total_duration, start_time, interval, overlay
+    ):
         output_filepath: str = os.path.join(output_dir, output_filename)
 
         if os.path.exists(output_filepath):
@@ -123,18 +149,17 @@ def split_audio_file(
                 os.remove(output_filepath)
             else:
                 print(f"スキップされたファイル: {output_filepath}（既に存在します）")
-                segment_number += 1
-                current_time += interval - overlay
                 continue
 
+        # -ss を -i より前に指定して入力側でシークし、ファイル先頭からの読み込みを避ける
         command: list[str] = [
             "ffmpeg",
-            "-i",
-            input_file,
             "-ss",
             str(current_time),
+            "-i",
+            input_file,
             "-t",
-            str(min(duration, total_duration - current_time)),
+            str(end_time - current_time),
             "-c",
             "copy",
             output_filepath,
@@ -143,8 +168,6 @@ def split_audio_file(
         if result.returncode != 0:
             break
         print(f"出力ファイル: {output_filepath}")
-        segment_number += 1
-        current_time += interval - overlay
 
 
 def main(args: Optional[Namespace] = None) -> None:
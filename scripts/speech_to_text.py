@@ -1,8 +1,25 @@
 import os
+import sys
+import json
 import argparse
+import functools
 from argparse import Namespace
-from typing import Optional
-import whisper
+from typing import Any, Optional
+
+if not __package__:
+    # python scripts/speech_to_text.py として直接実行された場合も scripts パッケージを読み込めるようにする
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 選択可能な推論バックエンド
+WHISPER_BACKENDS: tuple[str, ...] = ("fp32", "int8")
+# 再試行時の温度。whisper.transcribe のデフォルトと同じ値です。
+TEMPERATURES: tuple[float, ...] = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+# 圧縮率がこの値を超えた場合は、繰り返しの多い出力とみなして再試行します。
+COMPRESSION_RATIO_THRESHOLD: float = 2.4
+# 平均対数確率がこの値を下回った場合は、信頼度が低いとみなして再試行します。
+LOGPROB_THRESHOLD: float = -1.0
+# 無音である確率がこの値を超え、かつ平均対数確率が低い場合は無音とみなします。
+NO_SPEECH_THRESHOLD: float = 0.6
 
 
 def parse_arguments() -> Namespace:
@@ -32,16 +49,264 @@ def parse_arguments() -> Namespace:
         default="base",
         help="[OPTION] Whisper で使用するモデル。デフォルトは 'base' です。",
     )
+    parser.add_argument(
+        "--whisper-backend",
+        type=str,
+        choices=WHISPER_BACKENDS,
+        default="fp32",
+        help="[OPTION] Whisper の推論バックエンド。'int8' は線形層を動的量子化して CPU で推論します。"
+        "デフォルトは 'fp32' です。",
+    )
+    parser.add_argument(
+        "--feature-store-dir",
+        help="[OPTION] log-mel スペクトログラムを保存・再利用するディレクトリ。"
+        "指定しない場合は毎回計算します。",
+    )
     return parser.parse_args()
 
 
-def speech_to_text(input_file: str, model_name: str) -> str:
+def get_cache_dir() -> str:
+    """
+    量子化済みモデルを保存するディレクトリを返します。Whisper のモデルと同じ場所を使用します。
+    """
+    return os.path.join(
+        os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+        "whisper",
+    )
+
+
+def quantize_model(model: Any) -> Any:
+    """
+    Whisper モデルの線形層に int8 の動的量子化を適用します。
+    """
+    import torch
+    import whisper
+
+    # whisper.model.Linear は forward のみを上書きした nn.Linear のサブクラスであり、
+    # quantize_dynamic は型の完全一致で対象を判定するため、nn.Linear として扱わせる
+    for module in model.modules():
+        if type(module) is whisper.model.Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+def checkpoint_id(model_name: str) -> str:
+    """
+    Whisper のチェックポイントを識別する文字列を返します。
+
+    公式のモデル名の場合はモデル名とダウンロード URL に含まれる SHA-256 の先頭、
+    ファイルパスの場合はファイル名とサイズ・更新日時を使用します。
+    """
+    import whisper
+
+    if model_name in whisper._MODELS:
+        return f"{model_name}-{whisper._MODELS[model_name].split('/')[-2][:12]}"
+    stat = os.stat(model_name)
+    name: str = os.path.splitext(os.path.basename(model_name))[0]
+    return f"{name}-{stat.st_size}-{stat.st_mtime_ns}"
+
+
+@functools.lru_cache(maxsize=1)
+def load_model(model_name: str, backend: str = "fp32") -> Any:
+    """
+    Whisper モデルを読み込みます。
+
+    読み込んだモデルはプロセス内で再利用します。
+    int8 の場合、量子化済みモデルをディスクにキャッシュし、変換は初回のみ行います。
+    """
+    import torch
+    import whisper
+
+    if backend == "fp32":
+        return whisper.load_model(model_name)
+
+    # チェックポイントや whisper・torch の更新後に古い変換結果を読み込まないよう、
+    # それぞれの識別子をファイル名に含める
+    cache_file: str = os.path.join(
+        get_cache_dir(),
+        f"{checkpoint_id(model_name)}-int8"
+        f"-whisper{whisper.__version__}-torch{torch.__version__}.pt",
+    )
+    if os.path.exists(cache_file):
+        return torch.load(cache_file, map_location="cpu", weights_only=False)
+
+    model = quantize_model(whisper.load_model(model_name, device="cpu"))
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    # 書き込み途中のファイルを読み込まないよう、一時ファイルに保存してから置き換える
+    torch.save(model, cache_file + ".tmp")
+    os.replace(cache_file + ".tmp", cache_file)
+    print(f"量子化済みモデルを保存しました: {cache_file}")
+    return model
+
+
+def decode_with_fallback(model: Any, mel: Any, backend: str, prompt: Optional[str]) -> Any:
+    """
+    30 秒分の log-mel スペクトログラムを、タイムスタンプ付きで文字起こしします。
+
+    whisper.transcribe と同様に、圧縮率や平均対数確率が閾値を超えた場合は温度を上げて再試行します。
+    """
+    import torch
+    import whisper
+
+    mel_tensor = torch.from_numpy(mel.copy()).to(model.device)
+    result = None
+    for temperature in TEMPERATURES:
+        options = whisper.DecodingOptions(
+            language="ja",
+            temperature=temperature,
+            fp16=backend == "fp32" and model.device.type == "cuda",
+            prompt=prompt,
+        )
+        result = whisper.decode(model, mel_tensor, options)
+        needs_fallback: bool = (
+            result.compression_ratio > COMPRESSION_RATIO_THRESHOLD
+            or result.avg_logprob < LOGPROB_THRESHOLD
+        )
+        if (
+            result.no_speech_prob > NO_SPEECH_THRESHOLD
+            and result.avg_logprob < LOGPROB_THRESHOLD
+        ):
+            # 無音と判定された場合は再試行しない
+            needs_fallback = False
+        if not needs_fallback:
+            break
+    return result
+
+
+def find_seek_point(
+    tokens: list[int], timestamp_begin: int, segment_size: int, input_stride: int
+) -> tuple[int, int]:
+    """
+    デコード結果のトークンのうち確定した範囲のトークン数と、次のウィンドウまでに進めるフレーム数を返します。
+
+    whisper.transcribe と同様に、最後のセグメントが閉じていない場合（sample_len に達して
+    出力が打ち切られた場合や、発話がウィンドウの境界をまたぐ場合）は、その直前の
+    タイムスタンプの位置から次のウィンドウを始めます。
+    """
+    is_timestamp: list[bool] = [token >= timestamp_begin for token in tokens]
+    single_timestamp_ending: bool = is_timestamp[-2:] == [False, True]
+    consecutive: list[int] = [
+        i + 1 for i in range(len(tokens) - 1) if is_timestamp[i] and is_timestamp[i + 1]
+    ]
+    if not consecutive or single_timestamp_ending:
+        return len(tokens), segment_size
+    last_slice: int = consecutive[-1]
+    advance: int = (tokens[last_slice - 1] - timestamp_begin) * input_stride
+    if advance <= 0:
+        # 先頭のタイムスタンプしか確定していない場合は、同じ位置を繰り返しデコードしないよう進める
+        return len(tokens), segment_size
+    return last_slice, advance
+
+
+def transcribe(
+    input_file: str,
+    model_name: str,
+    backend: str = "fp32",
+    feature_store_dir: Optional[str] = None,
+) -> dict:
     """
     音声ファイルからテキストデータを抽出します。
+
+    音声は 30 秒ごとの log-mel スペクトログラムとして読み込み、保持するのは隣り合う 2 チャンク分だけのため、
+    入力ファイルの長さにかかわらずメモリ使用量は一定です。
+    whisper.transcribe と同様に、各ウィンドウは直前のウィンドウで確定した最後のタイムスタンプの
+    位置から始めるため、30 秒の境界をまたぐ発話や、1 回のデコードに収まらない長い発話も欠けません。
+    feature_store_dir を指定した場合、log-mel スペクトログラムは特徴量ストアから読み込みます。
+
+    戻り値はテキスト（text）と、ウィンドウごとの Whisper の指標（chunks）を持つ辞書です。
     """
-    model = whisper.load_model(model_name)
-    result = model.transcribe(input_file, language="ja")
-    return result["text"]
+    import numpy as np
+    import whisper
+    from whisper.audio import HOP_LENGTH, N_FRAMES, SAMPLE_RATE
+    import scripts.feature_store as feature_store
+    from scripts.audio_stream import probe_duration
+
+    model = load_model(model_name, backend)
+    n_mels: int = model.dims.n_mels
+    if feature_store_dir is None:
+        mels = feature_store.iter_log_mel(input_file, n_mels)
+    else:
+        mels = feature_store.load_features(input_file, n_mels, feature_store_dir)
+    tokenizer = whisper.tokenizer.get_tokenizer(
+        model.is_multilingual,
+        num_languages=model.num_languages,
+        language="ja",
+        task="transcribe",
+    )
+    # タイムスタンプ 1 単位あたりの log-mel のフレーム数
+    input_stride: int = N_FRAMES // model.dims.n_audio_ctx
+    # 最後のチャンクは無音でパディングされているため、音声の長さから実際のフレーム数を求める
+    content_frames: int = int(probe_duration(input_file) * SAMPLE_RATE / HOP_LENGTH)
+
+    # buffer は buffer_start フレーム目からの log-mel スペクトログラム
+    buffer = np.zeros((n_mels, 0), dtype=np.float32)
+    buffer_start: int = 0
+    seek: int = 0
+    texts: list[str] = []
+    chunks: list[dict] = []
+    while seek < content_frames:
+        while buffer_start + buffer.shape[1] < min(seek + N_FRAMES, content_frames):
+            mel = next(mels, None)
+            if mel is None:
+                content_frames = buffer_start + buffer.shape[1]
+                break
+            buffer = np.concatenate([buffer[:, seek - buffer_start :], mel], axis=1)
+            buffer_start = seek
+        segment_size: int = min(N_FRAMES, content_frames - seek)
+        if segment_size <= 0:
+            break
+        offset: int = seek - buffer_start
+        window = whisper.pad_or_trim(buffer[:, offset : offset + segment_size], N_FRAMES)
+
+        # 直前のウィンドウの文字起こし結果をプロンプトとして渡し、ウィンドウ間の文脈を保つ
+        result = decode_with_fallback(
+            model, window, backend, texts[-1] if texts else None
+        )
+        no_speech: bool = (
+            result.no_speech_prob > NO_SPEECH_THRESHOLD
+            and result.avg_logprob < LOGPROB_THRESHOLD
+        )
+        if no_speech:
+            text: str = ""
+            seek += segment_size
+        else:
+            consumed, advance = find_seek_point(
+                result.tokens, tokenizer.timestamp_begin, segment_size, input_stride
+            )
+            text = tokenizer.decode(result.tokens[:consumed]).strip()
+            seek += advance
+        chunks.append(
+            {
+                "text": text,
+                "no_speech_prob": result.no_speech_prob,
+                "avg_logprob": result.avg_logprob,
+                "compression_ratio": result.compression_ratio,
+                "temperature": result.temperature,
+                "no_speech": no_speech,
+            }
+        )
+        if text:
+            texts.append(text)
+    return {"text": "".join(texts), "chunks": chunks}
+
+
+def write_transcription(output_file: str, result: dict) -> None:
+    """
+    文字起こし結果のテキストを output_file に、Whisper の指標を同名の .json ファイルに保存します。
+    """
+    with open(output_file, "w") as f:
+        f.write(result["text"])
+    with open(os.path.splitext(output_file)[0] + ".json", "w") as f:
+        json.dump(result["chunks"], f, ensure_ascii=False, indent=2)
+
+
+def speech_to_text(input_file: str, model_name: str, backend: str = "fp32") -> str:
+    """
+    音声ファイルからテキストデータを抽出します。
+    """
+    return transcribe(input_file, model_name, backend)["text"]
 
 
 def main(args: Optional[Namespace] = None) -> None:
@@ -59,11 +324,20 @@ def main(args: Optional[Namespace] = None) -> None:
             output_file: str = os.path.join(
                 args.output_dir, os.path.splitext(file)[0] + f".{args.extension}"
             )
-            text: str = speech_to_text(input_file, args.whisper_model_name)
-            with open(output_file, "w") as f:
-                f.write(text)
+            result: dict = transcribe(
+                input_file,
+                args.whisper_model_name,
+                args.whisper_backend,
+                args.feature_store_dir,
+            )
+            write_transcription(output_file, result)
             print(f"テキストデータを保存しました: {output_file}")
-            print(f"テキストの内容: {text}")
+            print(f"テキストの内容: {result['text']}")
+
+    if args.feature_store_dir is not None:
+        import scripts.feature_store as feature_store
+
+        feature_store.evict_features(args.feature_store_dir, args.input_dir)
 
 
 if __name__ == "__main__":
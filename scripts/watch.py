@@ -0,0 +1,315 @@
+import os
+import json
+import time
+import queue
+import ctypes
+import ctypes.util
+import select
+import threading
+from argparse import Namespace
+from typing import Optional
+
+# inotify で監視するイベント（IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE）。
+# IN_MODIFY は書き込みのたびに発生し、コピー中に再スキャンが連続するため監視しない。
+# 書き込みが止まったかどうかは、ポーリング間隔ごとの再スキャンで判定する。
+INOTIFY_MASK: int = 0x00000008 | 0x00000080 | 0x00000100
+# 直近の処理結果として状態ファイルに残す件数
+RECENT_RESULTS: int = 50
+
+
+def open_inotify(directory: str) -> Optional[int]:
+    """
+    ディレクトリを inotify で監視するファイルディスクリプタを返します。
+
+    inotify が利用できない環境では None を返し、ポーリングで監視します。
+    """
+    library: Optional[str] = ctypes.util.find_library("c")
+    if library is None:
+        return None
+    try:
+        libc = ctypes.CDLL(library, use_errno=True)
+        fd: int = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(directory), INOTIFY_MASK) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def wait_for_changes(fd: Optional[int], timeout: float) -> None:
+    """
+    ディレクトリに変更があるか、timeout 秒が経過するまで待機します。
+    """
+    if fd is None:
+        time.sleep(timeout)
+        return
+    readable, _, _ = select.select([fd], [], [], timeout)
+    if readable:
+        # 溜まったイベントは読み捨てる。どのファイルが対象かはスキャンで判定する
+        try:
+            while os.read(fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+
+
+def seed_observed(source_dir: str, raw_dir: str, compare: str) -> dict:
+    """
+    監視開始時点で存在し、raw ディレクトリのコピーが最新の音声ファイルを処理済みとして記録した辞書を返します。
+
+    停止中に追加されたファイルなど、コピーが無いか古いファイルは記録せず、
+    書き込みの完了を確認してから処理の対象にします。
+    """
+    from scripts.create_and_copy_data import needs_copy
+
+    now: float = time.time()
+    observed: dict = {}
+    for file in sorted(os.listdir(source_dir)):
+        if not file.endswith((".mp3", ".wav")):
+            continue
+        path: str = os.path.join(source_dir, file)
+        try:
+            stat = os.stat(path)
+            if needs_copy(path, os.path.join(raw_dir, file), compare):
+                continue
+        except FileNotFoundError:
+            continue
+        observed[file] = {
+            "signature": (stat.st_size, stat.st_mtime_ns),
+            "first_seen": now,
+            "changed": now,
+            "queued": True,
+        }
+    return observed
+
+
+def scan_stable_files(
+    source_dir: str, observed: dict, settle_seconds: float
+) -> list[tuple[str, float]]:
+    """
+    書き込みが完了したとみなせる音声ファイルを返します。
+
+    サイズと更新日時が settle_seconds 秒以上変化していないファイルを、
+    書き込みが完了したファイルとして扱います。戻り値はファイルパスと最初に検出した時刻の組です。
+    """
+    now: float = time.time()
+    stable: list[tuple[str, float]] = []
+    for file in sorted(os.listdir(source_dir)):
+        if not file.endswith((".mp3", ".wav")):
+            continue
+        path: str = os.path.join(source_dir, file)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        signature: tuple[int, int] = (stat.st_size, stat.st_mtime_ns)
+        entry: Optional[dict] = observed.get(file)
+        if entry is None or entry["signature"] != signature:
+            observed[file] = {
+                "signature": signature,
+                "first_seen": entry["first_seen"] if entry else now,
+                "changed": now,
+                "queued": False,
+            }
+            continue
+        if not entry["queued"] and now - entry["changed"] >= settle_seconds:
+            entry["queued"] = True
+            stable.append((path, entry["first_seen"]))
+    for file in set(observed) - set(os.listdir(source_dir)):
+        del observed[file]
+    return stable
+
+
+def write_status(status_file: str, status: dict) -> None:
+    """
+    監視モードの状態を JSON ファイルに書き込みます。
+    """
+    with open(status_file + ".tmp", "w") as f:
+        json.dump(status, f, ensure_ascii=False, indent=2)
+    os.replace(status_file + ".tmp", status_file)
+
+
+def process_track(source_file: str, args: Namespace, dirs: dict) -> dict:
+    """
+    1 つの音声ファイルを コピー → 分割 → 正規化 → 文字起こし → 配置 の順に処理します。
+
+    戻り値はステージごとの所要時間（秒）です。
+    """
+    import scripts.create_and_copy_data as create_and_copy_data
+    import scripts.separate as separate
+    import scripts.speech_to_text as speech_to_text
+    import scripts.prepare_before_text_reformatting as prepare_before_text_reformatting
+    from scripts.audio_stream import normalize_loudness_files
+    from scripts.quality_gate import merge_report
+
+    timings: dict = {}
+    started: float = time.perf_counter()
+
+    create_and_copy_data.copy_file(
+        source_file, dirs["raw"], args.force_copy, args.copy_compare
+    )
+    raw_file: str = os.path.join(dirs["raw"], os.path.basename(source_file))
+    timings["copy"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    separate.split_audio_file(
+        raw_file,
+        dirs["separate"],
+        args.start,
+        args.term,
+        args.overlay,
+        args.force_separate,
+    )
+    segments: list[str] = separate.list_track_segments(dirs["separate"], raw_file)
+    timings["separate"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    jobs: list[tuple[str, str]] = [
+        (os.path.join(dirs["separate"], file), os.path.join(dirs["normalize"], file))
+        for file in segments
+        if args.force_normalize
+        or not os.path.exists(os.path.join(dirs["normalize"], file))
+    ]
+    normalize_loudness_files(jobs, args.loudness_target, args.normalize_workers)
+    timings["normalize"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for file in segments:
+        output_file: str = os.path.join(
+            dirs["transcribe"],
+            os.path.splitext(file)[0] + f".{args.transcription_extension}",
+        )
+        if os.path.exists(output_file) and not args.force_transcribe:
+            continue
+        result: dict = speech_to_text.transcribe(
+            os.path.join(dirs["normalize"], file),
+            args.whisper_model_name,
+            args.whisper_backend,
+            dirs["features"],
+        )
+        speech_to_text.write_transcription(output_file, result)
+        print(f"テキストデータを保存しました: {output_file}")
+    timings["transcribe"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    pruned: dict = {}
+    kept: list[str] = []
+    for file in segments:
+        reasons: list[str] = prepare_before_text_reformatting.stage_file(
+            file,
+            dirs["normalize"],
+            dirs["transcribe"],
+            dirs["before_text_reformatting"],
+            args.force_before_text_reformatting,
+            not args.disable_quality_gate,
+        )
+        if reasons:
+            pruned[file] = reasons
+        else:
+            kept.append(file)
+    if not args.disable_quality_gate:
+        kept_total, pruned_total = merge_report(dirs["quality_report"], pruned, kept)
+        print(
+            f"品質チェックの結果を保存しました: {dirs['quality_report']}"
+            f"（配置: {kept_total}、除外: {pruned_total}）"
+        )
+    timings["stage"] = time.perf_counter() - started
+    return timings
+
+
+def run(args: Namespace, dirs: dict) -> None:
+    """
+    コピー元のディレクトリを監視し、新しい音声ファイルを順に処理し続けます。
+
+    Whisper のモデルは起動時に一度だけ読み込み、以降のファイルで再利用します。
+    待ち行列の長さとファイルごとの処理時間は dirs["status_file"] に書き込みます。
+    """
+    import scripts.speech_to_text as speech_to_text
+
+    source_dir: str = args.copy_source_raw_directory
+    # モデルの読み込み中に書き込まれたファイルを処理済みとみなさないよう、読み込みの前に記録する
+    try:
+        seeded: Optional[dict] = seed_observed(
+            source_dir, dirs["raw"], args.copy_compare
+        )
+        print(f"コピー済みのファイルを処理済みとして記録しました: {len(seeded)} 件")
+    except OSError as e:
+        print(f"既存のファイルを確認できませんでした（監視の開始時に再試行します）: {e}")
+        seeded = None
+    speech_to_text.load_model(args.whisper_model_name, args.whisper_backend)
+
+    pending: queue.Queue = queue.Queue()
+    lock = threading.Lock()
+    status: dict = {
+        "source_dir": source_dir,
+        "watcher": "polling",
+        "queue_depth": 0,
+        "processing": None,
+        "processed": 0,
+        "failed": 0,
+        "recent": [],
+    }
+
+    def update_status(**changes) -> None:
+        with lock:
+            status.update(changes)
+            status["queue_depth"] = pending.qsize()
+            status["updated_at"] = time.time()
+            write_status(dirs["status_file"], status)
+
+    def watch() -> None:
+        fd: Optional[int] = open_inotify(source_dir)
+        update_status(watcher="inotify" if fd is not None else "polling")
+        observed: Optional[dict] = seeded
+        while True:
+            try:
+                if observed is None:
+                    observed = seed_observed(source_dir, dirs["raw"], args.copy_compare)
+                    print(f"コピー済みのファイルを処理済みとして記録しました: {len(observed)} 件")
+                stable = scan_stable_files(
+                    source_dir, observed, args.watch_settle_seconds
+                )
+                for path, first_seen in stable:
+                    pending.put((path, first_seen))
+                    print(f"処理待ちに追加しました: {path}")
+                if stable:
+                    update_status()
+            except Exception as e:
+                # ネットワーク共有が一時的に見えなくなった場合なども、監視を続ける
+                print(f"ディレクトリのスキャンに失敗しました（再試行します）: {e}")
+                time.sleep(args.watch_poll_interval)
+                continue
+            wait_for_changes(fd, args.watch_poll_interval)
+
+    threading.Thread(target=watch, daemon=True).start()
+    print(f"ディレクトリを監視しています: {source_dir}（Ctrl+C で終了します）")
+
+    try:
+        while True:
+            path, first_seen = pending.get()
+            update_status(processing=path)
+            started: float = time.time()
+            result: dict = {"file": path}
+            try:
+                result["timings"] = process_track(path, args, dirs)
+                result["ok"] = True
+            except Exception as e:
+                print(f"処理に失敗しました: {path}（{e}）")
+                result["ok"] = False
+                result["error"] = str(e)
+            finished: float = time.time()
+            result["processing_seconds"] = finished - started
+            result["latency_seconds"] = finished - first_seen
+            with lock:
+                recent: list = [result] + status["recent"]
+            update_status(
+                processing=None,
+                processed=status["processed"] + int(result["ok"]),
+                failed=status["failed"] + int(not result["ok"]),
+                recent=recent[:RECENT_RESULTS],
+            )
+    except KeyboardInterrupt:
+        print("監視を終了しました。")